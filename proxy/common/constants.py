@@ -40,6 +40,7 @@ PROXY_AGENT_HEADER = PROXY_AGENT_HEADER_KEY + \
 DEFAULT_BACKLOG = 100
 DEFAULT_BASIC_AUTH = None
 DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_BUFFER_POOL_SIZE = 16
 DEFAULT_CA_CERT_DIR = None
 DEFAULT_CA_CERT_FILE = None
 DEFAULT_CA_KEY_FILE = None
@@ -50,18 +51,21 @@ DEFAULT_CLIENT_RECVBUF_SIZE = DEFAULT_BUFFER_SIZE
 DEFAULT_DEVTOOLS_WS_PATH = b'/devtools'
 DEFAULT_DISABLE_HEADERS: List[bytes] = []
 DEFAULT_DISABLE_HTTP_PROXY = False
+DEFAULT_DISABLE_TCP_NODELAY = False
 DEFAULT_ENABLE_DASHBOARD = False
 DEFAULT_ENABLE_DEVTOOLS = False
 DEFAULT_ENABLE_EVENTS = False
 DEFAULT_EVENTS_QUEUE = None
 DEFAULT_ENABLE_STATIC_SERVER = False
 DEFAULT_ENABLE_WEB_SERVER = False
+DEFAULT_EVENT_BACKEND = 'selector'
 DEFAULT_IPV4_HOSTNAME = ipaddress.IPv4Address('127.0.0.1')
 DEFAULT_IPV6_HOSTNAME = ipaddress.IPv6Address('::1')
 DEFAULT_KEY_FILE = None
 DEFAULT_LOG_FILE = None
 DEFAULT_LOG_FORMAT = '%(asctime)s - pid:%(process)d [%(levelname)-.1s] %(funcName)s:%(lineno)d - %(message)s'
 DEFAULT_LOG_LEVEL = 'INFO'
+DEFAULT_MAX_CACHED_FILE_SIZE = 4096
 DEFAULT_NUM_WORKERS = 0
 DEFAULT_OPEN_FILE_LIMIT = 1024
 DEFAULT_PAC_FILE = None
@@ -73,20 +77,22 @@ DEFAULT_SERVER_RECVBUF_SIZE = DEFAULT_BUFFER_SIZE
 DEFAULT_STATIC_SERVER_DIR = os.path.join(PROXY_PY_DIR, "public")
 DEFAULT_THREADLESS = False
 DEFAULT_TIMEOUT = 10
+DEFAULT_URING_ENTRIES = 32
 DEFAULT_VERSION = False
 DEFAULT_HTTP_PORT = 80
-DEFAULT_MAX_SEND_SIZE = 16 * 1024
+DEFAULT_MAX_SEND_SIZE = 256 * 1024
+DEFAULT_TCP_NOTSENT_LOWAT = 128 * 1024
 
 DEFAULT_DATA_DIRECTORY_PATH = os.path.join(str(pathlib.Path.home()), '.proxy')
 
 # Cor plugins enabled by default or via flags
-PLUGIN_HTTP_PROXY = 'proxy.http.proxy.HttpProxyPlugin'
-PLUGIN_WEB_SERVER = 'proxy.http.server.HttpWebServerPlugin'
-PLUGIN_PAC_FILE = 'proxy.http.server.HttpWebServerPacFilePlugin'
-PLUGIN_DEVTOOLS_PROTOCOL = 'proxy.http.inspector.DevtoolsProtocolPlugin'
-PLUGIN_DASHBOARD = 'proxy.dashboard.dashboard.ProxyDashboard'
-PLUGIN_INSPECT_TRAFFIC = 'proxy.dashboard.inspect_traffic.InspectTrafficPlugin'
-PLUGIN_PROXY_AUTH = 'proxy.http.proxy.AuthPlugin'
+PLUGIN_HTTP_PROXY = b'proxy.http.proxy.HttpProxyPlugin'
+PLUGIN_WEB_SERVER = b'proxy.http.server.HttpWebServerPlugin'
+PLUGIN_PAC_FILE = b'proxy.http.server.HttpWebServerPacFilePlugin'
+PLUGIN_DEVTOOLS_PROTOCOL = b'proxy.http.inspector.DevtoolsProtocolPlugin'
+PLUGIN_DASHBOARD = b'proxy.dashboard.dashboard.ProxyDashboard'
+PLUGIN_INSPECT_TRAFFIC = b'proxy.dashboard.inspect_traffic.InspectTrafficPlugin'
+PLUGIN_PROXY_AUTH = b'proxy.http.proxy.AuthPlugin'
 
 PY2_DEPRECATION_MESSAGE = '''DEPRECATION: proxy.py no longer supports Python 2.7.  Kindly upgrade to Python 3+. '
                 'If for some reasons you cannot upgrade, use'
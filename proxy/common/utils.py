@@ -15,7 +15,7 @@ import ipaddress
 import socket
 
 from types import TracebackType
-from typing import Optional, Dict, Any, List, Tuple, Type, Callable
+from typing import Optional, Dict, Any, List, Tuple, Type, Callable, Union, NamedTuple
 
 from .constants import HTTP_1_1, COLON, WHITESPACE, CRLF, DEFAULT_TIMEOUT
 
@@ -25,6 +25,8 @@ def text_(s: Any, encoding: str = 'utf-8', errors: str = 'strict') -> Any:
 
     If s is of type bytes or int, return s.decode(encoding, errors),
     otherwise return s as it is."""
+    if isinstance(s, str):
+        return s
     if isinstance(s, int):
         return str(s)
     if isinstance(s, bytes):
@@ -37,6 +39,8 @@ def bytes_(s: Any, encoding: str = 'utf-8', errors: str = 'strict') -> Any:
 
     If s is type str or int, return s.encode(encoding, errors),
     otherwise return s as it is."""
+    if isinstance(s, bytes):
+        return s
     if isinstance(s, int):
         s = str(s)
     if isinstance(s, str):
@@ -80,6 +84,43 @@ def build_http_response(status_code: int,
     return build_http_pkt(line, headers, body)
 
 
+HttpResponseTemplate = NamedTuple('HttpResponseTemplate', [
+    ('prefix', bytes),
+    ('suffix', bytes),
+])
+
+
+def compile_http_response_template(
+        status_code: int,
+        protocol_version: bytes = HTTP_1_1,
+        reason: Optional[bytes] = None,
+        headers: Optional[Dict[bytes, bytes]] = None) -> HttpResponseTemplate:
+    """Pre-builds response line and headers of responses which only differ
+    by their body.
+
+    prefix ends right before the Content-Length header value,
+    see render_http_response_template."""
+    line = [protocol_version, bytes_(status_code)]
+    if reason:
+        line.append(reason)
+    pkt = build_http_pkt(line, headers)
+    return HttpResponseTemplate(
+        prefix=pkt[:-len(CRLF)] + b'Content-Length' + COLON + WHITESPACE,
+        suffix=CRLF + CRLF)
+
+
+def render_http_response_template(
+        template: HttpResponseTemplate,
+        content_length: int,
+        body: Optional[bytes] = None) -> bytes:
+    """Returns same packet as build_http_response would for template
+    headers followed by a Content-Length header."""
+    pkt = template.prefix + b'%d' % content_length + template.suffix
+    if body:
+        pkt += body
+    return pkt
+
+
 def build_http_header(k: bytes, v: bytes) -> bytes:
     """Build and return a HTTP header line for use in raw packet."""
     return k + COLON + WHITESPACE + v
@@ -151,6 +192,18 @@ def find_http_line(raw: bytes) -> Tuple[Optional[bytes], bytes]:
     return line, rest
 
 
+def as_bytes(raw: Union[bytes, memoryview]) -> bytes:
+    """Returns bytes for raw, to use bytes only methods e.g. find.
+
+    Doesn't copy when raw is a memoryview spanning an entire bytes
+    object, e.g. memoryview returned by TcpConnection.recv."""
+    if isinstance(raw, bytes):
+        return raw
+    if isinstance(raw.obj, bytes) and raw.nbytes == len(raw.obj):
+        return raw.obj
+    return raw.tobytes()
+
+
 def wrap_socket(conn: socket.socket, keyfile: str,
                 certfile: str) -> ssl.SSLSocket:
     ctx = ssl.create_default_context(
@@ -191,6 +244,11 @@ def new_socket_connection(
     return socket.create_connection(addr, timeout=timeout)
 
 
+def set_tcp_nodelay(conn: socket.socket) -> None:
+    """Disables Nagle's algorithm on conn."""
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
 class socket_connection(contextlib.ContextDecorator):
     """Same as new_socket_connection but as a context manager and decorator."""
 
@@ -25,8 +25,9 @@ from .threadless import Threadless
 
 from ..connection import TcpClientConnection
 from ..event import EventQueue, eventNames
-from ...common.constants import DEFAULT_THREADLESS
+from ...common.constants import DEFAULT_THREADLESS, DEFAULT_DISABLE_TCP_NODELAY
 from ...common.flag import flags
+from ...common.utils import set_tcp_nodelay
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,14 @@ flags.add_argument(
     help='Default: False.  When disabled a new thread is spawned '
     'to handle each client connection.'
 )
+flags.add_argument(
+    '--disable-tcp-nodelay',
+    action='store_true',
+    default=DEFAULT_DISABLE_TCP_NODELAY,
+    help='Default: False.  By default, TCP_NODELAY is set on client and '
+    'upstream server connections.  Use this option to keep Nagle\'s '
+    'algorithm enabled.'
+)
 
 
 class Acceptor(multiprocessing.Process):
@@ -98,6 +107,8 @@ class Acceptor(multiprocessing.Process):
         self.threadless_client_queue.close()
 
     def start_work(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+        if not self.flags.disable_tcp_nodelay:
+            set_tcp_nodelay(conn)
         if self.flags.threadless and \
                 self.threadless_client_queue and \
                 self.threadless_process:
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+import collections
+
+from typing import Deque
+
+from ...common.constants import DEFAULT_BUFFER_SIZE, DEFAULT_BUFFER_POOL_SIZE
+
+
+class BufferPool:
+    """Pool of preallocated bytearray buffers.
+
+    Used as scratch space for socket.recv_into, so that a fresh
+    buffer of maximum receive size isn't allocated for every recv
+    call.  Buffers must be released back into the pool once the
+    received bytes have been copied out.
+
+    append / pop on a deque are thread-safe, a single pool can
+    be shared by all threads within a process."""
+
+    def __init__(
+            self,
+            buffer_size: int = DEFAULT_BUFFER_SIZE,
+            max_size: int = DEFAULT_BUFFER_POOL_SIZE) -> None:
+        self.buffer_size = buffer_size
+        self.max_size = max_size
+        self.pool: Deque[bytearray] = collections.deque()
+
+    def acquire(self, size: int) -> bytearray:
+        """Returns a buffer of at least size bytes."""
+        try:
+            buf = self.pool.pop()
+        except IndexError:
+            return bytearray(max(size, self.buffer_size))
+        if len(buf) < size:
+            return bytearray(size)
+        return buf
+
+    def release(self, buf: bytearray) -> None:
+        if len(self.pool) < self.max_size:
+            self.pool.append(buf)
+
+
+bufpool = BufferPool()
@@ -8,6 +8,7 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
+import os
 import socket
 import ssl
 import logging
@@ -16,8 +17,24 @@ from typing import NamedTuple, Optional, Union, List
 
 from ...common.constants import DEFAULT_BUFFER_SIZE, DEFAULT_MAX_SEND_SIZE
 
+from .bufpool import bufpool
+
 logger = logging.getLogger(__name__)
 
+# socket.sendmsg is unavailable on Windows and for SSL sockets
+SENDMSG_SUPPORTED = hasattr(socket.socket, 'sendmsg')
+# sendmsg fails with EMSGSIZE when passed more buffers than IOV_MAX
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):   # pragma: no cover
+    IOV_MAX = -1
+if IOV_MAX <= 0:    # pragma: no cover
+    IOV_MAX = 1024
+# os.splice is only available on Linux with Python 3.10+
+SPLICE_SUPPORTED = hasattr(os, 'splice')
+# MSG_MORE is Linux only, elsewhere sends are never held back
+MSG_MORE = getattr(socket, 'MSG_MORE', 0)
+
 
 TcpConnectionTypes = NamedTuple('TcpConnectionTypes', [
     ('SERVER', int),
@@ -50,16 +67,23 @@ class TcpConnection(ABC):
         """Must return the socket connection to use in this class."""
         raise TcpConnectionUninitializedException()     # pragma: no cover
 
-    def send(self, data: bytes) -> int:
+    def send(self, data: Union[bytes, memoryview], flags: int = 0) -> int:
         """Users must handle BrokenPipeError exceptions"""
+        if flags:
+            return self.connection.send(data, flags)
         return self.connection.send(data)
 
     def recv(
             self, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Optional[memoryview]:
         """Users must handle socket.error exceptions"""
-        data: bytes = self.connection.recv(buffer_size)
-        if len(data) == 0:
-            return None
+        buf = bufpool.acquire(buffer_size)
+        try:
+            size = self.connection.recv_into(buf, buffer_size)
+            if size == 0:
+                return None
+            data = bytes(memoryview(buf)[:size])
+        finally:
+            bufpool.release(buf)
         logger.debug(
             'received %d bytes from %s' %
             (len(data), self.tag))
@@ -82,12 +106,81 @@ class TcpConnection(ABC):
         """Users must handle BrokenPipeError exceptions"""
         if not self.has_buffer():
             return 0
-        mv = self.buffer[0].tobytes()
-        sent: int = self.send(mv[:DEFAULT_MAX_SEND_SIZE])
+        if len(self.buffer) > 1 and self.can_sendmsg():
+            return self.flush_iov()
+        mv = self.buffer[0]
+        sent: int = self.send(
+            mv[:DEFAULT_MAX_SEND_SIZE],
+            self.more_flags(len(mv) > DEFAULT_MAX_SEND_SIZE or len(self.buffer) > 1))
         if sent == len(mv):
             self.buffer.pop(0)
         else:
-            self.buffer[0] = memoryview(mv[sent:])
-        del mv
+            self.buffer[0] = mv[sent:]
         logger.debug('flushed %d bytes to %s' % (sent, self.tag))
         return sent
+
+    def can_sendmsg(self) -> bool:
+        return SENDMSG_SUPPORTED and \
+            not isinstance(self.connection, ssl.SSLSocket)
+
+    def more_flags(self, pending: bool) -> int:
+        """Returns MSG_MORE when more queued data will follow this send.
+
+        Kernel then holds back a partial segment instead of pushing it
+        out on its own, e.g. response headers are coalesced with the first
+        chunk of body.  Last send out of the queue never carries MSG_MORE,
+        so data is never corked once the queue drains."""
+        if pending and MSG_MORE and \
+                not isinstance(self.connection, ssl.SSLSocket):
+            return MSG_MORE
+        return 0
+
+    def flush_iov(self) -> int:
+        """Writes out multiple queued buffers using a single sendmsg call.
+
+        Users must handle BrokenPipeError exceptions"""
+        iov: List[memoryview] = []
+        size = 0
+        for mv in self.buffer:
+            if size >= DEFAULT_MAX_SEND_SIZE or len(iov) >= IOV_MAX:
+                break
+            iov.append(mv[:DEFAULT_MAX_SEND_SIZE - size])
+            size += len(iov[-1])
+        flags = self.more_flags(
+            len(iov) < len(self.buffer) or len(iov[-1]) < len(self.buffer[len(iov) - 1]))
+        sent: int = self.connection.sendmsg(iov, [], flags) if flags \
+            else self.connection.sendmsg(iov)
+        remaining = sent
+        while self.buffer and remaining >= len(self.buffer[0]):
+            remaining -= len(self.buffer.pop(0))
+        if remaining > 0:
+            self.buffer[0] = self.buffer[0][remaining:]
+        logger.debug('flushed %d bytes to %s' % (sent, self.tag))
+        return sent
+
+    def can_splice(self) -> bool:
+        return SPLICE_SUPPORTED and \
+            not isinstance(self.connection, ssl.SSLSocket)
+
+    def splice_to(self, fd: int, nbytes: int) -> int:
+        """Moves up to nbytes received on this connection into fd,
+        without copying them into userspace.  One end of a splice
+        must be a pipe.
+
+        Returns 0 when connection was closed by the peer.
+        Users must handle BlockingIOError and socket.error exceptions"""
+        return os.splice(
+            self.connection.fileno(), fd, nbytes,
+            flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+
+    def splice_from(self, fd: int, nbytes: int) -> int:
+        """Moves up to nbytes from fd into this connection,
+        without copying them into userspace.  One end of a splice
+        must be a pipe.
+
+        Users must handle BlockingIOError and BrokenPipeError exceptions"""
+        sent: int = os.splice(
+            fd, self.connection.fileno(), nbytes,
+            flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        logger.debug('spliced %d bytes to %s' % (sent, self.tag))
+        return sent
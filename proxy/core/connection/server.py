@@ -14,6 +14,7 @@ from typing import Optional, Union, Tuple
 
 from .connection import TcpConnection, tcpConnectionTypes, TcpConnectionUninitializedException
 from ...common.utils import new_socket_connection
+from ...common.constants import DEFAULT_TCP_NOTSENT_LOWAT
 
 
 class TcpServerConnection(TcpConnection):
@@ -34,6 +35,13 @@ class TcpServerConnection(TcpConnection):
         if self._conn is not None:
             return
         self._conn = new_socket_connection(self.addr)
+        # Bound amount of unsent data buffered by the kernel,
+        # socket is reported writable once buffered data drains below it.
+        if hasattr(socket, 'TCP_NOTSENT_LOWAT'):
+            self._conn.setsockopt(
+                socket.IPPROTO_TCP,
+                socket.TCP_NOTSENT_LOWAT,
+                DEFAULT_TCP_NOTSENT_LOWAT)
 
     def wrap(self, hostname: str, ca_file: Optional[str]) -> None:
         ctx = ssl.create_default_context(
@@ -12,6 +12,8 @@ from .queue import EventQueue
 from .names import EventNames, eventNames
 from .dispatcher import EventDispatcher
 from .subscriber import EventSubscriber
+from .fastselector import FastSelector
+from .uring_loop import UringSelector, URING_SUPPORTED
 
 __all__ = [
     'eventNames',
@@ -19,4 +21,7 @@ __all__ = [
     'EventQueue',
     'EventDispatcher',
     'EventSubscriber',
+    'FastSelector',
+    'UringSelector',
+    'URING_SUPPORTED',
 ]
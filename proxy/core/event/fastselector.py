@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+import select
+import selectors
+
+from typing import Any, Dict, List, Tuple, Union
+
+from ...common.types import HasFileno
+
+
+def _fileno(fileobj: Union[int, HasFileno]) -> int:
+    return fileobj if isinstance(fileobj, int) else fileobj.fileno()
+
+
+class FastSelector:
+    """Thin wrapper over select.epoll / select.poll.
+
+    Unlike selectors.DefaultSelector, no SelectorKey is built per
+    registered descriptor or per ready event.  select() returns
+    raw (fileobj, events) tuples where events is a bitmask of
+    selectors.EVENT_READ and selectors.EVENT_WRITE.
+
+    Falls back to selectors.DefaultSelector on platforms where
+    neither epoll nor poll are available.
+    """
+
+    def __init__(self) -> None:
+        self.fileobjs: Dict[int, Union[int, HasFileno]] = {}
+        self.events: Dict[int, int] = {}
+        self.poller: Any = None
+        self.selector: Any = None
+        if hasattr(select, 'epoll'):
+            self.poller = select.epoll()
+            self.rd, self.wr = select.EPOLLIN, select.EPOLLOUT
+            # epoll.poll accepts seconds, poll.poll milliseconds
+            self.timeout_scale = 1
+        elif hasattr(select, 'poll'):
+            self.poller = select.poll()
+            self.rd, self.wr = select.POLLIN, select.POLLOUT
+            self.timeout_scale = 1000
+        else:   # pragma: no cover
+            self.selector = selectors.DefaultSelector()
+
+    def _mask(self, events: int) -> int:
+        mask = 0
+        if events & selectors.EVENT_READ:
+            mask |= self.rd
+        if events & selectors.EVENT_WRITE:
+            mask |= self.wr
+        return mask
+
+    def _lookup(self, fileobj: Union[int, HasFileno]) -> int:
+        """Returns fd that fileobj was registered with.
+
+        Same as selectors, falls back to a search by identity when
+        fileobj no longer has a valid fd, e.g. a socket that was
+        detached by ssl.wrap_socket while registered."""
+        fd = _fileno(fileobj)
+        if fd >= 0:
+            return fd
+        for fd, registered in self.fileobjs.items():
+            if registered is fileobj:
+                return fd
+        raise KeyError('{0!r} is not registered'.format(fileobj))
+
+    def register(self, fileobj: Union[int, HasFileno], events: int) -> None:
+        if self.selector is not None:   # pragma: no cover
+            self.selector.register(fileobj, events)
+            return
+        fd = _fileno(fileobj)
+        self.poller.register(fd, self._mask(events))
+        self.fileobjs[fd] = fileobj
+        self.events[fd] = events
+
+    def modify(self, fileobj: Union[int, HasFileno], events: int) -> None:
+        if self.selector is not None:   # pragma: no cover
+            self.selector.modify(fileobj, events)
+            return
+        fd = self._lookup(fileobj)
+        self.poller.modify(fd, self._mask(events))
+        self.fileobjs[fd] = fileobj
+        self.events[fd] = events
+
+    def unregister(self, fileobj: Union[int, HasFileno]) -> None:
+        if self.selector is not None:   # pragma: no cover
+            self.selector.unregister(fileobj)
+            return
+        fd = self._lookup(fileobj)
+        del self.fileobjs[fd]
+        del self.events[fd]
+        try:
+            self.poller.unregister(fd)
+        except OSError:
+            # This can happen if the fd was closed since it
+            # was registered, same as selectors ignore it.
+            pass
+
+    def select(self, timeout: float) -> List[Tuple[Union[int, HasFileno], int]]:
+        if self.selector is not None:   # pragma: no cover
+            return [(key.fileobj, mask)
+                    for key, mask in self.selector.select(timeout=timeout)]
+        ready = self.poller.poll(timeout * self.timeout_scale)
+        events = []
+        for fd, event in ready:
+            mask = 0
+            # Same as selectors, report error / hangup as
+            # both readable and writable.
+            if event & ~self.wr:
+                mask |= selectors.EVENT_READ
+            if event & ~self.rd:
+                mask |= selectors.EVENT_WRITE
+            events.append((self.fileobjs[fd], mask & self.events[fd]))
+        return events
+
+    def close(self) -> None:
+        if self.selector is not None:   # pragma: no cover
+            self.selector.close()
+            return
+        if hasattr(self.poller, 'close'):
+            self.poller.close()
+        self.fileobjs.clear()
+        self.events.clear()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+import errno
+import time
+import select
+import selectors
+
+from typing import Any, Dict, List, Tuple, Union
+
+from ...common.constants import DEFAULT_URING_ENTRIES
+from ...common.types import HasFileno
+
+try:
+    import liburing
+    URING_SUPPORTED = hasattr(select, 'epoll')
+except ImportError:     # pragma: no cover
+    URING_SUPPORTED = False
+
+
+def _fileno(fileobj: Union[int, HasFileno]) -> int:
+    return fileobj if isinstance(fileobj, int) else fileobj.fileno()
+
+
+class UringSelector:
+    """FastSelector compatible selector backed by io_uring.
+
+    Each registered descriptor is armed with a one-shot IORING_OP_POLL_ADD
+    submission.  Registrations are diffed against in-flight polls only
+    when select() is called, a poll stays armed across unregister and
+    register calls made in between for the same fileobj and events.
+    Changes are submitted to the kernel along with the wait for
+    completions, in a single io_uring_enter call per select().
+    With epoll, every register / unregister is a separate epoll_ctl call.
+
+    Requires liburing, see requirements-uring.txt.
+    """
+
+    def __init__(self, entries: int = DEFAULT_URING_ENTRIES) -> None:
+        self.ring: Any = liburing.Ring()
+        liburing.io_uring_queue_init(entries, self.ring)
+        self.cqe: Any = liburing.Cqe()
+        self.fileobjs: Dict[int, Union[int, HasFileno]] = {}
+        self.events: Dict[int, int] = {}
+        # Descriptors with an in-flight poll, mapped to user_data, events
+        # and fileobj of that poll.  Completions of polls which were since
+        # removed carry a stale user_data and are ignored.
+        self.polls: Dict[int, Tuple[int, int, Union[int, HasFileno]]] = {}
+        self.generation: int = 0
+
+    def _get_sqe(self) -> Any:
+        sqe = liburing.io_uring_get_sqe(self.ring)
+        if sqe is None:
+            # Submission ring is full, flush it into the kernel
+            liburing.io_uring_submit(self.ring)
+            sqe = liburing.io_uring_get_sqe(self.ring)
+        return sqe
+
+    def _arm(self, fd: int) -> None:
+        mask = 0
+        if self.events[fd] & selectors.EVENT_READ:
+            mask |= select.POLLIN
+        if self.events[fd] & selectors.EVENT_WRITE:
+            mask |= select.POLLOUT
+        self.generation = (self.generation + 1) & 0xFFFFFFFF
+        user_data = (self.generation << 32) | fd
+        sqe = self._get_sqe()
+        liburing.io_uring_prep_poll_add(sqe, fd, mask)
+        liburing.io_uring_sqe_set_data64(sqe, user_data)
+        self.polls[fd] = (user_data, self.events[fd], self.fileobjs[fd])
+
+    def _disarm(self, fd: int) -> None:
+        user_data = self.polls.pop(fd)[0]
+        sqe = self._get_sqe()
+        liburing.io_uring_prep_poll_remove(sqe, user_data)
+        liburing.io_uring_sqe_set_data64(sqe, 0)
+
+    def _lookup(self, fileobj: Union[int, HasFileno]) -> int:
+        """Same as FastSelector, falls back to a search by identity
+        when fileobj no longer has a valid fd."""
+        fd = _fileno(fileobj)
+        if fd >= 0:
+            return fd
+        for fd, registered in self.fileobjs.items():
+            if registered is fileobj:
+                return fd
+        raise KeyError('{0!r} is not registered'.format(fileobj))
+
+    def register(self, fileobj: Union[int, HasFileno], events: int) -> None:
+        fd = _fileno(fileobj)
+        self.fileobjs[fd] = fileobj
+        self.events[fd] = events
+
+    def modify(self, fileobj: Union[int, HasFileno], events: int) -> None:
+        fd = self._lookup(fileobj)
+        self.fileobjs[fd] = fileobj
+        self.events[fd] = events
+
+    def unregister(self, fileobj: Union[int, HasFileno]) -> None:
+        fd = self._lookup(fileobj)
+        del self.fileobjs[fd]
+        del self.events[fd]
+
+    def _sync(self) -> None:
+        for fd, (_, events, fileobj) in list(self.polls.items()):
+            if self.events.get(fd) != events or \
+                    self.fileobjs[fd] is not fileobj:
+                self._disarm(fd)
+        # Arm new registrations and re-arm descriptors whose
+        # one-shot poll fired during previous select
+        for fd in self.events:
+            if fd not in self.polls:
+                self._arm(fd)
+
+    def _reap(self) -> List[Tuple[Union[int, HasFileno], int]]:
+        events = []
+        seen = 0
+        cqe_iter = liburing.io_uring_cqe_iter_init(self.ring)
+        while liburing.io_uring_cqe_iter_next(cqe_iter, self.cqe):
+            seen += 1
+            cqe = self.cqe[0]
+            user_data = cqe.user_data
+            fd = user_data & 0xFFFFFFFF
+            if user_data == 0 or fd not in self.polls or \
+                    self.polls[fd][0] != user_data:
+                # Poll remove completions and cancelled polls
+                continue
+            del self.polls[fd]
+            try:
+                event = cqe.res
+            except OSError:
+                # Same as selectors, report errors as both readable and writable.
+                event = ~0
+            mask = 0
+            if event & ~select.POLLOUT:
+                mask |= selectors.EVENT_READ
+            if event & ~select.POLLIN:
+                mask |= selectors.EVENT_WRITE
+            events.append((self.fileobjs[fd], mask & self.events[fd]))
+        liburing.io_uring_cq_advance(self.ring, seen)
+        return events
+
+    def select(self, timeout: float) -> List[Tuple[Union[int, HasFileno], int]]:
+        self._sync()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                liburing.io_uring_submit_and_wait_timeout(
+                    self.ring, self.cqe, 1, liburing.timespec(max(timeout, 0)))
+            except OSError as e:
+                if e.errno not in (errno.ETIME, errno.EINTR):
+                    raise
+            events = self._reap()
+            if events:
+                return events
+            # Only stale completions were reaped, keep waiting
+            # for the remainder of timeout.
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return events
+
+    def close(self) -> None:
+        liburing.io_uring_queue_exit(self.ring)
+        self.fileobjs.clear()
+        self.events.clear()
+        self.polls.clear()
@@ -61,9 +61,10 @@ class ProxyDashboard(HttpWebServerBasePlugin):
 
     def handle_request(self, request: HttpParser) -> None:
         if request.path == b'/dashboard/':
-            self.client.queue(
-                HttpWebServerPlugin.read_and_build_static_file_response(
-                    os.path.join(self.flags.static_server_dir, 'dashboard', 'proxy.html')))
+            headers, body = HttpWebServerPlugin.read_and_build_static_file_response(
+                os.path.join(self.flags.static_server_dir, 'dashboard', 'proxy.html'))
+            self.client.queue(headers)
+            self.client.queue(body)
         elif request.path in (
                 b'/dashboard',
                 b'/dashboard/proxy.html'):
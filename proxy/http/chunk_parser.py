@@ -8,9 +8,9 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
-from typing import NamedTuple, Tuple, List, Optional
+from typing import NamedTuple, Tuple, List, Optional, Union
 
-from ..common.utils import bytes_, find_http_line
+from ..common.utils import as_bytes, bytes_
 from ..common.constants import CRLF, DEFAULT_BUFFER_SIZE
 
 
@@ -32,27 +32,36 @@ class ChunkParser:
         # Expected size of next following chunk
         self.size: Optional[int] = None
 
-    def parse(self, raw: bytes) -> bytes:
+    def parse(self, raw: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
         more = len(raw) > 0
         while more and self.state != chunkParserStates.COMPLETE:
             more, raw = self.process(raw)
         return raw
 
-    def process(self, raw: bytes) -> Tuple[bool, bytes]:
+    def process(
+            self,
+            raw: Union[bytes, memoryview]) -> Tuple[bool, Union[bytes, memoryview]]:
         if self.state == chunkParserStates.WAITING_FOR_SIZE:
             # Consume prior chunk in buffer
             # in case chunk size without CRLF was received
-            raw = self.chunk + raw
-            self.chunk = b''
+            if self.chunk:
+                raw = self.chunk + raw
+                self.chunk = b''
             # Extract following chunk data size
-            line, raw = find_http_line(raw)
-            # CRLF not received or Blank line was received.
-            if line is None or line.strip() == b'':
-                self.chunk = raw
+            data = as_bytes(raw)
+            pos = data.find(CRLF)
+            if pos == -1:
+                # CRLF not received.
+                self.chunk = data
+                raw = b''
+            elif data[:pos].strip() == b'':
+                # Blank line was received.
+                self.chunk = data[pos + len(CRLF):]
                 raw = b''
             else:
-                self.size = int(line, 16)
+                self.size = int(data[:pos], 16)
                 self.state = chunkParserStates.WAITING_FOR_DATA
+                raw = raw[pos + len(CRLF):]
         elif self.state == chunkParserStates.WAITING_FOR_DATA:
             assert self.size is not None
             remaining = self.size - len(self.chunk)
@@ -14,10 +14,11 @@ import selectors
 import ssl
 import time
 import contextlib
+import collections
 import errno
 import logging
 
-from typing import Tuple, List, Union, Optional, Generator, Dict
+from typing import Callable, Deque, List, Tuple, Union, Optional, Generator, Dict
 from uuid import UUID
 
 from .plugin import HttpProtocolHandlerPlugin
@@ -27,10 +28,11 @@ from .exception import HttpProtocolException
 from ..common.types import Readables, Writables
 from ..common.utils import wrap_socket
 from ..core.acceptor.work import Work
-from ..core.event import EventQueue
+from ..core.event import EventQueue, FastSelector, UringSelector, URING_SUPPORTED
 from ..core.connection import TcpClientConnection
 from ..common.flag import flags
 from ..common.constants import DEFAULT_CLIENT_RECVBUF_SIZE, DEFAULT_KEY_FILE, DEFAULT_TIMEOUT
+from ..common.constants import DEFAULT_EVENT_BACKEND
 
 
 logger = logging.getLogger(__name__)
@@ -44,6 +46,16 @@ flags.add_argument(
     'client in a single recv() operation. Bump this '
     'value for faster uploads at the expense of '
     'increased RAM.')
+flags.add_argument(
+    '--event-backend',
+    type=str,
+    default=DEFAULT_EVENT_BACKEND,
+    choices=['selector', 'uring'],
+    help='Default: ' + DEFAULT_EVENT_BACKEND + '.  Readiness polling backend '
+    'used by connection handlers.  uring batches descriptor registration '
+    'and polling into a single io_uring submission per loop, requires Linux '
+    'and liburing.  Falls back to selector when unavailable.'
+)
 flags.add_argument(
     '--key-file',
     type=str,
@@ -62,6 +74,26 @@ flags.add_argument(
 )
 
 
+# Request parsers released by finished connections, reused by new ones.
+# append / pop on a deque are thread-safe.
+parser_pool: Deque[HttpParser] = collections.deque()
+
+
+def acquire_request_parser() -> HttpParser:
+    try:
+        return parser_pool.pop()
+    except IndexError:
+        return HttpParser(httpParserTypes.REQUEST_PARSER)
+
+
+def release_request_parser(parser: HttpParser, max_size: int) -> None:
+    if len(parser_pool) < max_size:
+        # Reset before pooling, so that pooled parsers don't
+        # keep previous request body and buffers alive.
+        parser.reset(httpParserTypes.REQUEST_PARSER)
+        parser_pool.append(parser)
+
+
 class HttpProtocolHandler(Work):
     """HTTP, HTTPS, HTTP2, WebSockets protocol handler.
 
@@ -76,11 +108,31 @@ class HttpProtocolHandler(Work):
 
         self.start_time: float = time.time()
         self.last_activity: float = self.start_time
-        self.request: HttpParser = HttpParser(httpParserTypes.REQUEST_PARSER)
+        self.request: HttpParser = acquire_request_parser()
         self.response: HttpParser = HttpParser(httpParserTypes.RESPONSE_PARSER)
-        self.selector = selectors.DefaultSelector()
+        self.selector: Union[FastSelector, UringSelector] = self.new_selector()
         self.client: TcpClientConnection = client
         self.plugins: Dict[str, HttpProtocolHandlerPlugin] = {}
+        # Frozen copies of plugins and their per event callbacks,
+        # built once in initialize and iterated on every event.
+        self._plugins: Tuple[HttpProtocolHandlerPlugin, ...] = ()
+        self._get_descriptors_callbacks: Tuple[
+            Callable[[], Tuple[List[socket.socket], List[socket.socket]]], ...] = ()
+        self._write_to_descriptors_callbacks: Tuple[Callable[[Writables], bool], ...] = ()
+        self._read_from_descriptors_callbacks: Tuple[Callable[[Readables], bool], ...] = ()
+
+    def new_selector(self) -> Union[FastSelector, UringSelector]:
+        """io_uring is only used when handler runs its own event loop.
+        In threadless mode, selector only serves flush on shutdown."""
+        if self.flags.event_backend == 'uring' and URING_SUPPORTED and \
+                not self.flags.threadless:
+            try:
+                return UringSelector()
+            except OSError as e:
+                # e.g. ENOMEM when locked memory limit has been reached
+                logger.warning(
+                    'Unable to setup io_uring, falling back to selector: %r' % e)
+        return FastSelector()
 
     def encryption_enabled(self) -> bool:
         return self.flags.keyfile is not None and \
@@ -114,10 +166,18 @@ class HttpProtocolHandler(Work):
                     self.request,
                     self.event_queue)
                 self.plugins[instance.name()] = instance
+        self._plugins = tuple(self.plugins.values())
+        self._get_descriptors_callbacks = tuple(
+            p.get_descriptors for p in self._plugins)
+        self._write_to_descriptors_callbacks = tuple(
+            p.write_to_descriptors for p in self._plugins)
+        self._read_from_descriptors_callbacks = tuple(
+            p.read_from_descriptors for p in self._plugins)
         logger.debug('Handling connection %r' % self.client.connection)
 
     def is_inactive(self) -> bool:
         if not self.client.has_buffer() and \
+                not any(plugin.has_pending() for plugin in self._plugins) and \
                 self.connection_inactive_for() > self.flags.timeout:
             return True
         return False
@@ -129,8 +189,8 @@ class HttpProtocolHandler(Work):
         if self.client.has_buffer():
             events[self.client.connection] |= selectors.EVENT_WRITE
         # HttpProtocolHandlerPlugin.get_descriptors
-        for plugin in self.plugins.values():
-            plugin_read_desc, plugin_write_desc = plugin.get_descriptors()
+        for get_descriptors in self._get_descriptors_callbacks:
+            plugin_read_desc, plugin_write_desc = get_descriptors()
             for r in plugin_read_desc:
                 if r not in events:
                     events[r] = selectors.EVENT_READ
@@ -148,25 +208,43 @@ class HttpProtocolHandler(Work):
             readables: Readables,
             writables: Writables) -> bool:
         """Returns True if proxy must teardown."""
-        # Flush buffer for ready to write sockets
-        teardown = self.handle_writables(writables)
+        teardown = self.write_events(writables)
         if teardown:
             return True
 
-        # Invoke plugin.write_to_descriptors
-        for plugin in self.plugins.values():
-            teardown = plugin.write_to_descriptors(writables)
+        # Read from ready to read sockets
+        teardown = self.handle_readables(readables)
+        if not teardown:
+            # Invoke plugin.read_from_descriptors
+            for read_from_descriptors in self._read_from_descriptors_callbacks:
+                teardown = read_from_descriptors(readables)
+                if teardown:
+                    break
+
+        # Response queued while handling client data is flushed within
+        # this pass instead of waiting for next select to report client
+        # as writable.  Client socket almost always is, if not, writes
+        # are retried once select reports so.
+        if self.client.connection in readables and not self.client.closed:
             if teardown:
+                # e.g. error or Connection: close responses, plugins
+                # are skipped as their state may be half initialized.
+                self.handle_writables([self.client.connection])
                 return True
+            return self.write_events([self.client.connection])
 
-        # Read from ready to read sockets
-        teardown = self.handle_readables(readables)
+        return teardown
+
+    def write_events(self, writables: Writables) -> bool:
+        """Returns True if proxy must teardown."""
+        # Flush buffer for ready to write sockets
+        teardown = self.handle_writables(writables)
         if teardown:
             return True
 
-        # Invoke plugin.read_from_descriptors
-        for plugin in self.plugins.values():
-            teardown = plugin.read_from_descriptors(readables)
+        # Invoke plugin.write_to_descriptors
+        for write_to_descriptors in self._write_to_descriptors_callbacks:
+            teardown = write_to_descriptors(writables)
             if teardown:
                 return True
 
@@ -178,7 +256,7 @@ class HttpProtocolHandler(Work):
             self.flush()
 
             # Invoke plugin.on_client_connection_close
-            for plugin in self.plugins.values():
+            for plugin in self._plugins:
                 plugin.on_client_connection_close()
 
             logger.debug(
@@ -198,7 +276,9 @@ class HttpProtocolHandler(Work):
         finally:
             self.client.connection.close()
             logger.debug('Client connection closed')
+            self.selector.close()
             super().shutdown()
+            release_request_parser(self.request, self.flags.num_workers * 2)
 
     def connection_inactive_for(self) -> float:
         return time.time() - self.last_activity
@@ -211,8 +291,7 @@ class HttpProtocolHandler(Work):
                 self.client.connection,
                 selectors.EVENT_WRITE)
             while self.client.has_buffer():
-                ev: List[Tuple[selectors.SelectorKey, int]
-                         ] = self.selector.select(timeout=1)
+                ev = self.selector.select(timeout=1)
                 if len(ev) == 0:
                     continue
                 self.client.flush()
@@ -222,21 +301,26 @@ class HttpProtocolHandler(Work):
             self.selector.unregister(self.client.connection)
 
     def handle_writables(self, writables: Writables) -> bool:
+        if self.client.connection in writables:
+            # Plugins may also write directly into client connection
+            # e.g. HttpProxyPlugin when splicing upstream data.
+            self.last_activity = time.time()
         if self.client.has_buffer() and self.client.connection in writables:
             logger.debug('Client is ready for writes, flushing buffer')
-            self.last_activity = time.time()
 
             # TODO(abhinavsingh): This hook could just reside within server recv block
             # instead of invoking when flushed to client.
             # Invoke plugin.on_response_chunk
             chunk = self.client.buffer
-            for plugin in self.plugins.values():
+            for plugin in self._plugins:
                 chunk = plugin.on_response_chunk(chunk)
                 if chunk is None:
                     break
 
             try:
                 self.client.flush()
+            except (BlockingIOError, ssl.SSLWantWriteError):
+                logger.debug('Client is not ready for writes, will retry')
             except BrokenPipeError:
                 logger.error(
                     'BrokenPipeError when flushing buffer for client')
@@ -273,14 +357,10 @@ class HttpProtocolHandler(Work):
             try:
                 # HttpProtocolHandlerPlugin.on_client_data
                 # Can raise HttpProtocolException to teardown the connection
-                plugin_index = 0
-                plugins = list(self.plugins.values())
-                while plugin_index < len(plugins) and client_data:
-                    client_data = plugins[plugin_index].on_client_data(
-                        client_data)
-                    if client_data is None:
+                for plugin in self._plugins:
+                    if not client_data:
                         break
-                    plugin_index += 1
+                    client_data = plugin.on_client_data(client_data)
 
                 # Don't parse request any further after 1st request has completed.
                 # This specially does happen for pipeline requests.
@@ -289,18 +369,16 @@ class HttpProtocolHandler(Work):
                 # valid request.
                 if client_data and self.request.state != httpParserStates.COMPLETE:
                     # Parse http request
-                    # TODO(abhinavsingh): Remove .tobytes after parser is
-                    # memoryview compliant
-                    self.request.parse(client_data.tobytes())
+                    self.request.parse(client_data)
                     if self.request.state == httpParserStates.COMPLETE:
                         # Invoke plugin.on_request_complete
-                        for plugin in self.plugins.values():
+                        for plugin in self._plugins:
                             upgraded_sock = plugin.on_request_complete()
                             if isinstance(upgraded_sock, ssl.SSLSocket):
                                 logger.debug(
                                     'Updated client conn to %s', upgraded_sock)
                                 self.client._conn = upgraded_sock
-                                for plugin_ in self.plugins.values():
+                                for plugin_ in self._plugins:
                                     if plugin_ != plugin:
                                         plugin_.client._conn = upgraded_sock
                             elif isinstance(upgraded_sock, bool) and upgraded_sock is True:
@@ -324,11 +402,11 @@ class HttpProtocolHandler(Work):
         ev = self.selector.select(timeout=1)
         readables = []
         writables = []
-        for key, mask in ev:
+        for fileobj, mask in ev:
             if mask & selectors.EVENT_READ:
-                readables.append(key.fileobj)
+                readables.append(fileobj)
             if mask & selectors.EVENT_WRITE:
-                writables.append(key.fileobj)
+                writables.append(fileobj)
         yield (readables, writables)
         for fd in events:
             self.selector.unregister(fd)
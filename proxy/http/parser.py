@@ -8,14 +8,15 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
+from types import MappingProxyType
 from urllib import parse as urlparse
-from typing import TypeVar, NamedTuple, Optional, Dict, Type, Tuple, List
+from typing import TypeVar, NamedTuple, Optional, Dict, Type, Tuple, List, Union, Mapping
 
 from .methods import httpMethods
 from .chunk_parser import ChunkParser, chunkParserStates
 
 from ..common.constants import DEFAULT_DISABLE_HEADERS, COLON, CRLF, WHITESPACE, HTTP_1_1, DEFAULT_HTTP_PORT
-from ..common.utils import build_http_request, build_http_response, find_http_line, text_
+from ..common.utils import build_http_request, build_http_response, as_bytes, text_
 
 
 HttpParserStates = NamedTuple('HttpParserStates', [
@@ -43,6 +44,12 @@ class HttpParser:
 
     def __init__(self, parser_type: int) -> None:
         self.type: int = parser_type
+        self.reset()
+
+    def reset(self, parser_type: Optional[int] = None) -> None:
+        """Resets parser state, allowing parser instances to be reused."""
+        if parser_type is not None:
+            self.type = parser_type
         self.state: int = httpParserStates.INITIALIZED
 
         # Total size of raw bytes passed for parsing
@@ -51,7 +58,11 @@ class HttpParser:
         # Buffer to hold unprocessed bytes
         self.buffer: bytes = b''
 
-        self.headers: Dict[bytes, Tuple[bytes, bytes]] = {}
+        # Headers are stored as parallel lists of names (as received)
+        # and values, along with lowercased name to list position index.
+        self.header_names: List[bytes] = []
+        self.header_values: List[bytes] = []
+        self.header_index: Dict[bytes, int] = {}
         self.body: Optional[bytes] = None
 
         self.method: Optional[bytes] = None
@@ -81,24 +92,50 @@ class HttpParser:
         parser.parse(raw)
         return parser
 
+    @property
+    def headers(self) -> Mapping[bytes, Tuple[bytes, bytes]]:
+        """Read-only lowercased header name to (name, value) mapping.
+
+        Built on every access, prefer header / has_header instead.
+        Mapping can't be modified, use add_header / del_header to
+        change headers."""
+        return MappingProxyType({
+            k: (self.header_names[i], self.header_values[i])
+            for k, i in self.header_index.items()})
+
     def header(self, key: bytes) -> bytes:
-        if key.lower() not in self.headers:
+        index = self.header_index.get(key.lower())
+        if index is None:
             raise KeyError('%s not found in headers', text_(key))
-        return self.headers[key.lower()][1]
+        return self.header_values[index]
 
     def has_header(self, key: bytes) -> bool:
-        return key.lower() in self.headers
+        return key.lower() in self.header_index
 
     def add_header(self, key: bytes, value: bytes) -> None:
-        self.headers[key.lower()] = (key, value)
+        lower = key.lower()
+        index = self.header_index.get(lower)
+        if index is None:
+            self.header_index[lower] = len(self.header_names)
+            self.header_names.append(key)
+            self.header_values.append(value)
+        else:
+            self.header_names[index] = key
+            self.header_values[index] = value
 
     def add_headers(self, headers: List[Tuple[bytes, bytes]]) -> None:
         for (key, value) in headers:
             self.add_header(key, value)
 
     def del_header(self, header: bytes) -> None:
-        if header.lower() in self.headers:
-            del self.headers[header.lower()]
+        index = self.header_index.pop(header.lower(), None)
+        if index is None:
+            return
+        del self.header_names[index]
+        del self.header_values[index]
+        for k, i in self.header_index.items():
+            if i > index:
+                self.header_index[k] = i - 1
 
     def del_headers(self, headers: List[bytes]) -> None:
         for key in headers:
@@ -130,28 +167,32 @@ class HttpParser:
             self.path = self.build_path()
 
     def is_chunked_encoded(self) -> bool:
-        return b'transfer-encoding' in self.headers and \
-               self.headers[b'transfer-encoding'][1].lower() == b'chunked'
+        return b'transfer-encoding' in self.header_index and \
+               self.header(b'transfer-encoding').lower() == b'chunked'
 
     def body_expected(self) -> bool:
-        return (b'content-length' in self.headers and
+        return (b'content-length' in self.header_index and
                 int(self.header(b'content-length')) > 0) or \
             self.is_chunked_encoded()
 
-    def parse(self, raw: bytes) -> None:
+    def parse(self, raw: Union[bytes, memoryview]) -> None:
         """Parses Http request out of raw bytes.
 
+        raw can also be a memoryview, in which case body bytes are sliced
+        out of it without intermediate copies.
+
         Check HttpParser state after parse has successfully returned."""
         self.total_size += len(raw)
-        raw = self.buffer + raw
-        self.buffer = b''
+        if self.buffer:
+            raw = self.buffer + raw
+            self.buffer = b''
 
         more = len(raw) > 0
         while more and self.state != httpParserStates.COMPLETE:
             if self.state in (
                     httpParserStates.HEADERS_COMPLETE,
                     httpParserStates.RCVING_BODY):
-                if b'content-length' in self.headers:
+                if b'content-length' in self.header_index:
                     self.state = httpParserStates.RCVING_BODY
                     if self.body is None:
                         self.body = b''
@@ -175,39 +216,66 @@ class HttpParser:
                         'Parser shouldn\'t have reached here')
             else:
                 more, raw = self.process(raw)
-        self.buffer = raw
-
-    def process(self, raw: bytes) -> Tuple[bool, bytes]:
-        """Returns False when no CRLF could be found in received bytes."""
-        line, raw = find_http_line(raw)
-        if line is None:
-            return False, raw
-
+        self.buffer = as_bytes(raw) if len(raw) > 0 else b''
+
+    def process(
+            self,
+            raw: Union[bytes, memoryview]) -> Tuple[bool, Union[bytes, memoryview]]:
+        """Processes request / response line and all complete header
+        lines found in received bytes.
+
+        Lines are extracted out of a bytes view of raw, remaining
+        bytes are returned as a single slice of raw.
+        Returns False when no CRLF could be found in received bytes."""
+        data = as_bytes(raw)
+        start = 0
         if self.state == httpParserStates.INITIALIZED:
-            self.process_line(line)
+            pos = data.find(CRLF)
+            if pos == -1:
+                return False, raw
+            self.process_line(data[:pos])
             self.state = httpParserStates.LINE_RCVD
-        elif self.state in (httpParserStates.LINE_RCVD, httpParserStates.RCVING_HEADERS):
-            if self.state == httpParserStates.LINE_RCVD:
-                # LINE_RCVD state is equivalent to RCVING_HEADERS
-                self.state = httpParserStates.RCVING_HEADERS
-            if line.strip() == b'':  # Blank line received.
-                self.state = httpParserStates.HEADERS_COMPLETE
-            else:
-                self.process_header(line)
+            start = pos + len(CRLF)
+            # When server sends a response line without any header or body e.g.
+            # HTTP/1.1 200 Connection established\r\n\r\n
+            if self.type == httpParserTypes.RESPONSE_PARSER and \
+                    len(data) - start == len(CRLF) and \
+                    data.endswith(CRLF):
+                self.state = httpParserStates.COMPLETE
+                return True, raw[start:]
+
+        end = self.process_headers(data, start)
+        if end == 0:
+            return False, raw
+        raw = raw[end:]
 
-        # When server sends a response line without any header or body e.g.
-        # HTTP/1.1 200 Connection established\r\n\r\n
-        if self.state == httpParserStates.LINE_RCVD and \
-                self.type == httpParserTypes.RESPONSE_PARSER and \
-                raw == CRLF:
-            self.state = httpParserStates.COMPLETE
-        elif self.state == httpParserStates.HEADERS_COMPLETE and \
+        if self.state == httpParserStates.HEADERS_COMPLETE and \
                 not self.body_expected() and \
-                raw == b'':
+                len(raw) == 0:
             self.state = httpParserStates.COMPLETE
 
         return len(raw) > 0, raw
 
+    def process_headers(self, data: bytes, start: int = 0) -> int:
+        """Processes all complete header lines found in data after start.
+
+        Lines are located by offset, so that remaining bytes are
+        sliced out only once instead of once per header line.
+        Returns offset up to which data was consumed."""
+        while self.state != httpParserStates.HEADERS_COMPLETE:
+            pos = data.find(CRLF, start)
+            if pos == -1:
+                break
+            line = data[start:pos]
+            start = pos + len(CRLF)
+            # LINE_RCVD state is equivalent to RCVING_HEADERS
+            self.state = httpParserStates.RCVING_HEADERS
+            if line.strip() == b'':  # Blank line received.
+                self.state = httpParserStates.HEADERS_COMPLETE
+            else:
+                self.process_header(line)
+        return start
+
     def process_line(self, raw: bytes) -> None:
         line = raw.split(WHITESPACE)
         if self.type == httpParserTypes.REQUEST_PARSER:
@@ -247,8 +315,8 @@ class HttpParser:
             self.body
         return build_http_request(
             self.method, self.path, self.version,
-            headers={} if not self.headers else {self.headers[k][0]: self.headers[k][1] for k in self.headers if
-                                                 k.lower() not in disable_headers},
+            headers={n: v for n, v in zip(self.header_names, self.header_values)
+                     if n.lower() not in disable_headers},
             body=body
         )
 
@@ -259,8 +327,7 @@ class HttpParser:
             status_code=int(self.code),
             protocol_version=self.version,
             reason=self.reason,
-            headers={} if not self.headers else {
-                self.headers[k][0]: self.headers[k][1] for k in self.headers},
+            headers=dict(zip(self.header_names, self.header_values)),
             body=self.body if not self.is_chunked_encoded() else ChunkParser.to_chunks(self.body))
 
     def has_upstream_server(self) -> bool:
@@ -103,6 +103,11 @@ class HttpProtocolHandlerPlugin(ABC):
         Return optionally modified chunk to return back to client."""
         return chunk  # pragma: no cover
 
+    def has_pending(self) -> bool:
+        """Return True while plugin holds data for the client outside of
+        client buffer.  Connection isn't torn down for inactivity meanwhile."""
+        return False
+
     @abstractmethod
     def on_client_connection_close(self) -> None:
         """Client connection shutdown has been received, flush has been called,
@@ -30,7 +30,7 @@ from ...common.constants import DEFAULT_CA_CERT_DIR, DEFAULT_CA_CERT_FILE, DEFAU
 from ...common.constants import DEFAULT_CA_KEY_FILE, DEFAULT_CA_SIGNING_KEY_FILE
 from ...common.constants import COMMA, DEFAULT_SERVER_RECVBUF_SIZE, DEFAULT_CERT_FILE
 from ...common.constants import PROXY_AGENT_HEADER_VALUE, DEFAULT_DISABLE_HEADERS
-from ...common.utils import build_http_response, text_
+from ...common.utils import build_http_response, set_tcp_nodelay, text_
 from ...common.pki import gen_public_key, gen_csr, sign_csr
 
 from ...core.event import eventNames
@@ -118,6 +118,10 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
         self.response: HttpParser = HttpParser(httpParserTypes.RESPONSE_PARSER)
         self.pipeline_request: Optional[HttpParser] = None
         self.pipeline_response: Optional[HttpParser] = None
+        # Pipe used to splice upstream data into client connection,
+        # along with number of bytes spliced but not yet sent to client.
+        self.splice_pipe: Optional[Tuple[int, int]] = None
+        self.splice_pending: int = 0
 
         self.plugins: Dict[str, HttpProxyBasePlugin] = {}
         if b'HttpProxyBasePlugin' in self.flags.plugins:
@@ -135,6 +139,17 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
             self.flags.ca_signing_key_file is not None and \
             self.flags.ca_cert_file is not None
 
+    def can_splice(self) -> bool:
+        """Upstream data can be spliced directly into client connection
+        only for CONNECT tunnels which are not intercepted and which
+        no plugin wishes to inspect."""
+        return self.server is not None and \
+            self.request.method == httpMethods.CONNECT and \
+            not self.tls_interception_enabled() and \
+            not self.plugins and \
+            self.server.can_splice() and \
+            self.client.can_splice()
+
     def get_descriptors(
             self) -> Tuple[List[socket.socket], List[socket.socket]]:
         if not self.request.has_upstream_server():
@@ -143,7 +158,11 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
         r: List[socket.socket] = []
         w: List[socket.socket] = []
         if self.server and not self.server.closed and self.server.connection:
-            r.append(self.server.connection)
+            if self.splice_pending > 0:
+                # Stop reading from server until spliced data is sent to client
+                w.append(self.client.connection)
+            else:
+                r.append(self.server.connection)
         if self.server and not self.server.closed and \
                 self.server.has_buffer() and self.server.connection:
             w.append(self.server.connection)
@@ -159,6 +178,10 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
         return r, w
 
     def write_to_descriptors(self, w: Writables) -> bool:
+        if self.splice_pending > 0 and self.client.connection in w:
+            logger.debug('Client is write ready, draining splice pipe')
+            if self.drain_splice_pipe():
+                return True
         if self.server and self.server.connection not in w:
             # Currently, we just call write/read block of each plugins.  It is
             # plugins responsibility to ignore this callback, if passed descriptors
@@ -197,6 +220,8 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
                 and self.server \
                 and not self.server.closed \
                 and self.server.connection in r:
+            if not self.client.has_buffer() and self.can_splice():
+                return self.splice_upstream()
             logger.debug('Server is ready for reads, reading...')
             try:
                 raw = self.server.recv(self.flags.server_recvbuf_size)
@@ -242,9 +267,7 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
                 if self.response.state == httpParserStates.COMPLETE:
                     self.handle_pipeline_response(raw)
                 else:
-                    # TODO(abhinavsingh): Remove .tobytes after parser is
-                    # memoryview compliant
-                    self.response.parse(raw.tobytes())
+                    self.response.parse(raw)
                     self.emit_response_events()
             else:
                 self.response.total_size += len(raw)
@@ -252,6 +275,10 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
             self.client.queue(raw)
         return False
 
+    def has_pending(self) -> bool:
+        # Upstream data parked in splice pipe, yet to be written to client
+        return self.splice_pending > 0
+
     def on_client_connection_close(self) -> None:
         if not self.request.has_upstream_server():
             return
@@ -282,6 +309,53 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
             logger.debug(
                 'Closed server connection, has buffer %s' %
                 self.server.has_buffer())
+            if self.splice_pipe is not None:
+                os.close(self.splice_pipe[0])
+                os.close(self.splice_pipe[1])
+                self.splice_pipe = None
+
+    def splice_upstream(self) -> bool:
+        """Moves data received from server into client connection via
+        a pipe, without copying it into userspace.  Data which client
+        isn't ready to receive yet remains within the pipe."""
+        assert self.server is not None
+        if self.splice_pipe is None:
+            self.splice_pipe = os.pipe()
+        logger.debug('Server is ready for reads, splicing...')
+        try:
+            spliced = self.server.splice_to(
+                self.splice_pipe[1], self.flags.server_recvbuf_size)
+        except BlockingIOError:
+            return False
+        except OSError as e:
+            if e.errno == errno.ECONNRESET:
+                logger.warning('Connection reset by upstream: %r' % e)
+            else:
+                logger.exception(
+                    'Exception while splicing from %s connection %r with reason %r' %
+                    (self.server.tag, self.server.connection, e))
+            return True
+        if spliced == 0:
+            logger.debug('Server closed connection, tearing down...')
+            return True
+        self.response.total_size += spliced
+        self.splice_pending += spliced
+        return self.drain_splice_pipe()
+
+    def drain_splice_pipe(self) -> bool:
+        assert self.splice_pipe is not None
+        try:
+            self.splice_pending -= self.client.splice_from(
+                self.splice_pipe[0], self.splice_pending)
+        except BlockingIOError:
+            pass
+        except BrokenPipeError:
+            logger.error('BrokenPipeError when splicing data to client')
+            return True
+        except OSError:
+            logger.error('OSError when splicing data to client')
+            return True
+        return False
 
     def on_response_chunk(self, chunk: List[memoryview]) -> List[memoryview]:
         # TODO: Allow to output multiple access_log lines
@@ -314,9 +388,7 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
                     self.pipeline_request = HttpParser(
                         httpParserTypes.REQUEST_PARSER)
 
-                # TODO(abhinavsingh): Remove .tobytes after parser is
-                # memoryview compliant
-                self.pipeline_request.parse(raw.tobytes())
+                self.pipeline_request.parse(raw)
                 if self.pipeline_request.state == httpParserStates.COMPLETE:
                     for plugin in self.plugins.values():
                         assert self.pipeline_request is not None
@@ -394,9 +466,7 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
         if self.pipeline_response is None:
             self.pipeline_response = HttpParser(
                 httpParserTypes.RESPONSE_PARSER)
-        # TODO(abhinavsingh): Remove .tobytes after parser is memoryview
-        # compliant
-        self.pipeline_response.parse(raw.tobytes())
+        self.pipeline_response.parse(raw)
         if self.pipeline_response.state == httpParserStates.COMPLETE:
             self.pipeline_response = None
 
@@ -436,6 +506,8 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
                     (text_(host), port))
                 self.server.connect()
                 self.server.connection.setblocking(False)
+                if not self.flags.disable_tcp_nodelay:
+                    set_tcp_nodelay(self.server.connection)
                 logger.debug(
                     'Connected to upstream %s:%s' %
                     (text_(host), port))
@@ -597,7 +669,8 @@ class HttpProxyPlugin(HttpProtocolHandlerPlugin):
                 if self.request.method == httpMethods.CONNECT
                 else 'http://%s:%d%s' % (text_(self.request.host), self.request.port, text_(self.request.path)),
                 'method': text_(self.request.method),
-                'headers': {text_(k): text_(v[1]) for k, v in self.request.headers.items()},
+                'headers': {text_(k): text_(self.request.header_values[i])
+                            for k, i in self.request.header_index.items()},
                 'body': text_(self.request.body)
                 if self.request.method == httpMethods.POST
                 else None
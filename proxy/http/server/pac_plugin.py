@@ -15,7 +15,7 @@ from .plugin import HttpWebServerBasePlugin
 from .protocols import httpProtocolTypes
 from ..websocket import WebsocketFrame
 from ..parser import HttpParser
-from ...common.utils import bytes_, text_, build_http_response
+from ...common.utils import bytes_, text_, compile_http_response_template, render_http_response_template
 from ...common.flag import flags
 from ...common.constants import DEFAULT_PAC_FILE, DEFAULT_PAC_FILE_URL_PATH
 
@@ -37,6 +37,12 @@ flags.add_argument(
 
 class HttpWebServerPacFilePlugin(HttpWebServerBasePlugin):
 
+    PAC_FILE_RESPONSE_TEMPLATE = compile_http_response_template(
+        200, reason=b'OK', headers={
+            b'Content-Type': b'application/x-ns-proxy-autoconfig',
+            b'Content-Encoding': b'gzip',
+        })
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.pac_file_response: Optional[memoryview] = None
@@ -70,9 +76,6 @@ class HttpWebServerPacFilePlugin(HttpWebServerBasePlugin):
                     content = f.read()
             except IOError:
                 content = bytes_(self.flags.pac_file)
-            self.pac_file_response = memoryview(build_http_response(
-                200, reason=b'OK', headers={
-                    b'Content-Type': b'application/x-ns-proxy-autoconfig',
-                    b'Content-Encoding': b'gzip',
-                }, body=gzip.compress(content)
-            ))
+            body = gzip.compress(content)
+            self.pac_file_response = memoryview(render_http_response_template(
+                self.PAC_FILE_RESPONSE_TEMPLATE, len(body), body))
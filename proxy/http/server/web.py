@@ -10,12 +10,17 @@
 """
 import gzip
 import re
+import contextlib
 import time
+import mmap
 import logging
 import os
+import sys
+import threading
+import collections
 import mimetypes
 import socket
-from typing import List, Tuple, Optional, Dict, Union, Any, Pattern
+from typing import List, Tuple, Optional, Dict, Union, Any, Pattern, Set, Generator
 
 from .plugin import HttpWebServerBasePlugin
 from .protocols import httpProtocolTypes
@@ -25,13 +30,18 @@ from ..codes import httpStatusCodes
 from ..parser import HttpParser, httpParserStates, httpParserTypes
 from ..plugin import HttpProtocolHandlerPlugin
 
-from ...common.utils import bytes_, text_, build_http_response, build_websocket_handshake_response
-from ...common.constants import DEFAULT_STATIC_SERVER_DIR, PROXY_AGENT_HEADER_VALUE
+from ...common.utils import bytes_, text_, build_http_response, HttpResponseTemplate
+from ...common.utils import compile_http_response_template, render_http_response_template
+from ...common.utils import build_websocket_handshake_response
+from ...common.constants import DEFAULT_STATIC_SERVER_DIR, DEFAULT_MAX_CACHED_FILE_SIZE, PROXY_AGENT_HEADER_VALUE
 from ...common.types import Readables, Writables
 from ...common.flag import flags
 
 logger = logging.getLogger(__name__)
 
+# os.sendfile is only used on platforms where it accepts a socket as out_fd
+SENDFILE_SUPPORTED = hasattr(os, 'sendfile') and \
+    sys.platform.startswith(('linux', 'freebsd'))
 
 flags.add_argument(
     '--static-server-dir',
@@ -41,6 +51,14 @@ flags.add_argument(
     'This option is only applicable when static server is also enabled. '
     'See --enable-static-server.'
 )
+flags.add_argument(
+    '--max-cached-file-size',
+    type=int,
+    default=DEFAULT_MAX_CACHED_FILE_SIZE,
+    help='Default: 4096 bytes.  Static files up to this size are kept '
+    'in memory and served without reading them from disk on every request.  '
+    'Use 0 to disable.'
+)
 
 
 class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
@@ -60,6 +78,46 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
                  b'Connection': b'close'}
     ))
 
+    # Gzip encoded responses for static files, computed on first request
+    # and reused until the file changes.  Entries are keyed by normalized
+    # path and hold the (st_mtime_ns, st_size) signature, time of last
+    # validation and the (headers, body) response pair.
+    # Bounded by total size of cached compressed bodies.
+    MAX_PRECOMPRESS_FILE_SIZE = 1024 * 1024
+    MAX_PRECOMPRESSED_BYTES = 16 * 1024 * 1024
+    PRECOMPRESS_REVALIDATE_INTERVAL = 1.0
+    precompressed: 'collections.OrderedDict[str, Tuple[Tuple[int, int], float, Tuple[memoryview, memoryview]]]' = \
+        collections.OrderedDict()
+    precompressed_bytes = 0
+    precompressed_lock = threading.Lock()
+
+    # Uncompressed responses for small static files, see --max-cached-file-size.
+    # Entries are keyed by path and hold the (st_mtime_ns, st_size) signature
+    # of the file along with the (headers, body) response pair.
+    # Bounded by total size of cached file content.
+    MAX_SMALL_FILE_CACHE_BYTES = 16 * 1024 * 1024
+    small_file_cache: 'collections.OrderedDict[str, Tuple[Tuple[int, int], Tuple[memoryview, memoryview]]]' = \
+        collections.OrderedDict()
+    small_file_cache_bytes = 0
+    small_file_cache_lock = threading.Lock()
+
+    # Read-only file descriptors kept open for static files served via
+    # os.sendfile, keyed by path along with the (st_mtime_ns, st_size)
+    # signature of the file at the time of opening.  Descriptors are
+    # shared across connections, reads use explicit offsets.
+    # Evicted descriptors are closed once no longer in use.
+    MAX_FD_CACHE_SIZE = 256
+    fd_cache: 'collections.OrderedDict[str, Tuple[Tuple[int, int], int]]' = \
+        collections.OrderedDict()
+    fd_refs: Dict[int, int] = {}
+    fd_evicted: Set[int] = set()
+    fd_cache_lock = threading.Lock()
+
+    # Static file responses only differ by their Content-Length and body,
+    # response line and remaining headers are compiled once per
+    # (content type, gzip encoded) pair.
+    static_file_templates: Dict[Tuple[str, bool], HttpResponseTemplate] = {}
+
     def __init__(
             self,
             *args: Any, **kwargs: Any) -> None:
@@ -73,6 +131,11 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
             httpProtocolTypes.WEBSOCKET: {},
         }
         self.route: Optional[HttpWebServerBasePlugin] = None
+        # Pending static file response being served via os.sendfile
+        self.sendfile_headers: Optional[memoryview] = None
+        self.sendfile_fd: Optional[int] = None
+        self.sendfile_offset: int = 0
+        self.sendfile_size: int = 0
 
         if b'HttpWebServerBasePlugin' in self.flags.plugins:
             for klass in self.flags.plugins[b'HttpWebServerBasePlugin']:
@@ -89,22 +152,210 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
             self.flags.certfile is not None
 
     @staticmethod
-    def read_and_build_static_file_response(path: str) -> memoryview:
+    @contextlib.contextmanager
+    def map_static_file(path: str) -> Generator[Union[mmap.mmap, bytes], None, None]:
+        """Yields a read-only mmap of the file at path, unmapped on exit.
+
+        Mappings are never kept across requests.  A file truncated on disk
+        while it is being read through the mapping still raises SIGBUS,
+        that window is limited to compressing a single response."""
+        with open(path, 'rb') as f:
+            # Empty files cannot be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+    @classmethod
+    def precompress_static_file(
+            cls, path: str) -> Optional[Tuple[memoryview, memoryview]]:
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+        if stat.st_size > cls.MAX_PRECOMPRESS_FILE_SIZE:
+            with cls.precompressed_lock:
+                cls.discard_precompressed(path)
+            return None
         with open(path, 'rb') as f:
             content = f.read()
+        response = cls.build_gzip_static_file_response(path, content)
+        with cls.precompressed_lock:
+            cls.discard_precompressed(path)
+            cls.precompressed[path] = (
+                (stat.st_mtime_ns, stat.st_size), time.time(), response)
+            cls.precompressed_bytes += len(response[1])
+            while cls.precompressed_bytes > cls.MAX_PRECOMPRESSED_BYTES:
+                _, (_, _, evicted) = cls.precompressed.popitem(last=False)
+                cls.precompressed_bytes -= len(evicted[1])
+        return response
+
+    @classmethod
+    def discard_precompressed(cls, path: str) -> None:
+        """Must be called with precompressed_lock held."""
+        entry = cls.precompressed.pop(path, None)
+        if entry is not None:
+            cls.precompressed_bytes -= len(entry[2][1])
+
+    @classmethod
+    def precompressed_response(
+            cls, path: str) -> Optional[Tuple[memoryview, memoryview]]:
+        """Returns gzip response for path, compressing the file on first request.
+
+        Returns None for files larger than MAX_PRECOMPRESS_FILE_SIZE.
+        Cached entry is re-validated against the file on disk at most
+        once every PRECOMPRESS_REVALIDATE_INTERVAL seconds."""
+        path = os.path.normpath(path)
+        with cls.precompressed_lock:
+            entry = cls.precompressed.get(path)
+            if entry is not None:
+                cls.precompressed.move_to_end(path)
+        if entry is None:
+            return cls.precompress_static_file(path)
+        signature, validated_at, response = entry
+        now = time.time()
+        if now - validated_at < cls.PRECOMPRESS_REVALIDATE_INTERVAL:
+            return response
+        stat = os.stat(path)
+        if signature == (stat.st_mtime_ns, stat.st_size):
+            with cls.precompressed_lock:
+                if path in cls.precompressed:
+                    cls.precompressed[path] = (signature, now, response)
+            return response
+        return cls.precompress_static_file(path)
+
+    @classmethod
+    def read_and_build_static_file_response(
+            cls, path: str) -> Tuple[memoryview, memoryview]:
+        response = cls.precompressed_response(path)
+        if response is not None:
+            return response
+        with cls.map_static_file(path) as content:
+            return cls.build_gzip_static_file_response(path, content)
+
+    @classmethod
+    def cached_small_file_response(
+            cls, path: str, max_size: int) -> Optional[Tuple[memoryview, memoryview]]:
+        """Returns uncompressed response for files of at most max_size bytes.
+
+        Responses are cached in memory and invalidated when the file's
+        modification time or size changes on disk."""
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+        if stat.st_size > max_size:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with cls.small_file_cache_lock:
+            if path in cls.small_file_cache:
+                cached_signature, response = cls.small_file_cache[path]
+                if cached_signature == signature:
+                    cls.small_file_cache.move_to_end(path)
+                    return response
+                del cls.small_file_cache[path]
+                cls.small_file_cache_bytes -= len(response[1])
+        with open(path, 'rb') as f:
+            content = f.read()
+        response = (
+            cls.build_static_file_headers(path, len(content)),
+            memoryview(content))
+        with cls.small_file_cache_lock:
+            if path in cls.small_file_cache:
+                cls.small_file_cache_bytes -= len(cls.small_file_cache[path][1][1])
+            cls.small_file_cache[path] = (signature, response)
+            cls.small_file_cache_bytes += len(content)
+            while cls.small_file_cache_bytes > cls.MAX_SMALL_FILE_CACHE_BYTES:
+                _, (_, evicted) = cls.small_file_cache.popitem(last=False)
+                cls.small_file_cache_bytes -= len(evicted[1])
+        return response
+
+    @classmethod
+    def acquire_static_file_fd(cls, path: str) -> Tuple[int, int]:
+        """Returns a cached read-only descriptor and size of the file at path.
+
+        Descriptor must be released using release_static_file_fd."""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with cls.fd_cache_lock:
+            if path in cls.fd_cache:
+                cached_signature, fd = cls.fd_cache[path]
+                if cached_signature == signature:
+                    cls.fd_cache.move_to_end(path)
+                    cls.fd_refs[fd] += 1
+                    return fd, stat.st_size
+                del cls.fd_cache[path]
+                cls.evict_static_file_fd(fd)
+            fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+            cls.fd_cache[path] = (signature, fd)
+            cls.fd_refs[fd] = 1
+            if len(cls.fd_cache) > cls.MAX_FD_CACHE_SIZE:
+                _, (_, evicted) = cls.fd_cache.popitem(last=False)
+                cls.evict_static_file_fd(evicted)
+            return fd, stat.st_size
+
+    @classmethod
+    def release_static_file_fd(cls, fd: int) -> None:
+        with cls.fd_cache_lock:
+            cls.fd_refs[fd] -= 1
+            if cls.fd_refs[fd] == 0 and fd in cls.fd_evicted:
+                cls.fd_evicted.remove(fd)
+                del cls.fd_refs[fd]
+                os.close(fd)
+
+    @classmethod
+    def evict_static_file_fd(cls, fd: int) -> None:
+        """Must be called with fd_cache_lock held."""
+        if cls.fd_refs[fd] == 0:
+            del cls.fd_refs[fd]
+            os.close(fd)
+        else:
+            cls.fd_evicted.add(fd)
+
+    @classmethod
+    def static_file_template(cls, path: str, gzipped: bool) -> HttpResponseTemplate:
         content_type = mimetypes.guess_type(path)[0]
         if content_type is None:
             content_type = 'text/plain'
-        return memoryview(build_http_response(
-            httpStatusCodes.OK,
-            reason=b'OK',
-            headers={
+        template = cls.static_file_templates.get((content_type, gzipped))
+        if template is None:
+            headers = {
                 b'Content-Type': bytes_(content_type),
                 b'Cache-Control': b'max-age=86400',
-                b'Content-Encoding': b'gzip',
-                b'Connection': b'close',
-            },
-            body=gzip.compress(content)))
+            }
+            if gzipped:
+                headers[b'Content-Encoding'] = b'gzip'
+            headers[b'Connection'] = b'close'
+            template = compile_http_response_template(
+                httpStatusCodes.OK, reason=b'OK', headers=headers)
+            cls.static_file_templates[(content_type, gzipped)] = template
+        return template
+
+    @classmethod
+    def build_gzip_static_file_response(
+            cls,
+            path: str,
+            content: Union[mmap.mmap, bytes]) -> Tuple[memoryview, memoryview]:
+        body = gzip.compress(content, compresslevel=9)
+        headers = render_http_response_template(
+            cls.static_file_template(path, True), len(body))
+        return memoryview(headers), memoryview(body)
+
+    @classmethod
+    def build_static_file_headers(cls, path: str, content_length: int) -> memoryview:
+        return memoryview(render_http_response_template(
+            cls.static_file_template(path, False), content_length))
+
+    def accepts_gzip(self) -> bool:
+        return self.request.has_header(b'accept-encoding') and \
+            b'gzip' in self.request.header(b'accept-encoding').lower()
+
+    def can_sendfile(self) -> bool:
+        """Static files are served via os.sendfile only for clear text
+        connections from clients which do not accept gzip encoding."""
+        return SENDFILE_SUPPORTED and \
+            not self.encryption_enabled() and \
+            not self.accepts_gzip()
 
     def serve_file_or_404(self, path: str) -> bool:
         """Read and serves a file from disk.
@@ -113,11 +364,31 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
         Shouldn't this be server error?
         """
         try:
-            self.client.queue(
-                self.read_and_build_static_file_response(path))
+            response = None
+            if not self.accepts_gzip():
+                # Served from memory regardless of whether os.sendfile
+                # can be used, e.g. for TLS clients or on other platforms.
+                response = self.cached_small_file_response(
+                    path, self.flags.max_cached_file_size)
+            if response is None:
+                if self.can_sendfile():
+                    fd, size = self.acquire_static_file_fd(path)
+                else:
+                    response = self.read_and_build_static_file_response(path)
         except IOError:
             self.client.queue(self.DEFAULT_404_RESPONSE)
-        return True
+            return True
+        if response is not None:
+            self.client.queue(response[0])
+            self.client.queue(response[1])
+            return True
+        self.sendfile_fd = fd
+        self.sendfile_offset = 0
+        self.sendfile_size = size
+        self.sendfile_headers = self.build_static_file_headers(
+            path, self.sendfile_size)
+        # Response is written from write_to_descriptors
+        return False
 
     def try_upgrade(self) -> bool:
         if self.request.has_header(b'connection') and \
@@ -184,11 +455,59 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
     # TODO(abhinavsingh): Call plugin get/read/write descriptor callbacks
     def get_descriptors(
             self) -> Tuple[List[socket.socket], List[socket.socket]]:
+        if self.sendfile_fd is not None:
+            return [], [self.client.connection]
         return [], []
 
     def write_to_descriptors(self, w: Writables) -> bool:
+        if self.sendfile_fd is not None and \
+                self.client.connection in w and \
+                not self.client.has_buffer():
+            return self.flush_sendfile()
         return False
 
+    def has_pending(self) -> bool:
+        # Static file response being served via os.sendfile
+        return self.sendfile_fd is not None
+
+    def flush_sendfile(self) -> bool:
+        """Writes pending static file response using os.sendfile.
+
+        Returns True once the whole file has been sent, so that
+        the connection can be teardown."""
+        assert self.sendfile_fd is not None
+        conn = self.client.connection
+        try:
+            if self.sendfile_headers is not None:
+                # Hint kernel that file content will follow the headers
+                sent = self.client.send(
+                    self.sendfile_headers, self.client.more_flags(True))
+                if sent < len(self.sendfile_headers):
+                    self.sendfile_headers = self.sendfile_headers[sent:]
+                    return False
+                self.sendfile_headers = None
+            while self.sendfile_offset < self.sendfile_size:
+                sent = os.sendfile(
+                    conn.fileno(),
+                    self.sendfile_fd,
+                    self.sendfile_offset,
+                    self.sendfile_size - self.sendfile_offset)
+                if sent == 0:
+                    break
+                self.sendfile_offset += sent
+        except BlockingIOError:
+            return False
+        except OSError:
+            logger.error('OSError when serving static file to client')
+        self.close_sendfile()
+        return True
+
+    def close_sendfile(self) -> None:
+        if self.sendfile_fd is not None:
+            self.release_static_file_fd(self.sendfile_fd)
+            self.sendfile_fd = None
+            self.sendfile_headers = None
+
     def read_from_descriptors(self, r: Readables) -> bool:
         return False
 
@@ -218,9 +537,7 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
             if self.pipeline_request is None:
                 self.pipeline_request = HttpParser(
                     httpParserTypes.REQUEST_PARSER)
-            # TODO(abhinavsingh): Remove .tobytes after parser is memoryview
-            # compliant
-            self.pipeline_request.parse(raw.tobytes())
+            self.pipeline_request.parse(raw)
             if self.pipeline_request.state == httpParserStates.COMPLETE:
                 self.route.handle_request(self.pipeline_request)
                 if not self.pipeline_request.is_http_1_1_keep_alive():
@@ -236,6 +553,7 @@ class HttpWebServerPlugin(HttpProtocolHandlerPlugin):
     def on_client_connection_close(self) -> None:
         if self.request.has_upstream_server():
             return
+        self.close_sendfile()
         if self.switched_protocol:
             # Invoke plugin.on_websocket_close
             assert self.route
@@ -58,7 +58,7 @@ class FilterByURLRegexPlugin(HttpProxyBasePlugin):
         if request.host:
             request_host = request.host
         else:
-            if b'host' in request.headers:
+            if request.has_header(b'host'):
                 request_host = request.header(b'host')
 
         if not request_host:
@@ -40,7 +40,7 @@ class ModifyChunkResponsePlugin(HttpProxyBasePlugin):
     def handle_upstream_chunk(self, chunk: memoryview) -> memoryview:
         # Parse the response.
         # Note that these chunks also include headers
-        self.response.parse(chunk.tobytes())
+        self.response.parse(chunk)
         # If response is complete, modify and dispatch to client
         if self.response.state == httpParserStates.COMPLETE:
             self.response.body = b'\n'.join(self.DEFAULT_CHUNKS) + b'\n'
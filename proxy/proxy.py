@@ -202,7 +202,7 @@ class Proxy:
 
         # Load default plugins along with user provided --plugins
         plugins = Proxy.load_plugins(
-            [bytes_(p) for p in collections.OrderedDict(default_plugins).keys()] +
+            list(collections.OrderedDict(default_plugins).keys()) +
             [p if isinstance(p, type) else bytes_(p) for p in opts.get(
                 'plugins', args.plugins.split(text_(COMMA)))]
         )
@@ -293,13 +293,28 @@ class Proxy:
             opts.get(
                 'enable_static_server',
                 args.enable_static_server))
+        args.max_cached_file_size = cast(
+            int,
+            opts.get(
+                'max_cached_file_size',
+                args.max_cached_file_size))
         args.devtools_ws_path = cast(
             bytes,
             opts.get(
                 'devtools_ws_path',
                 getattr(args, 'devtools_ws_path', DEFAULT_DEVTOOLS_WS_PATH)))
         args.timeout = cast(int, opts.get('timeout', args.timeout))
+        args.event_backend = cast(
+            str,
+            opts.get(
+                'event_backend',
+                args.event_backend))
         args.threadless = cast(bool, opts.get('threadless', args.threadless))
+        args.disable_tcp_nodelay = cast(
+            bool,
+            opts.get(
+                'disable_tcp_nodelay',
+                args.disable_tcp_nodelay))
         args.enable_events = cast(
             bool,
             opts.get(
@@ -366,10 +381,10 @@ class Proxy:
 
     @staticmethod
     def get_default_plugins(
-            args: argparse.Namespace) -> List[Tuple[str, bool]]:
+            args: argparse.Namespace) -> List[Tuple[bytes, bool]]:
         # Prepare list of plugins to load based upon
         # --enable-*, --disable-* and --basic-auth flags.
-        default_plugins: List[Tuple[str, bool]] = []
+        default_plugins: List[Tuple[bytes, bool]] = []
         if args.basic_auth is not None:
             default_plugins.append((PLUGIN_PROXY_AUTH, True))
         if args.enable_dashboard:
@@ -8,6 +8,8 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
+import os
+
 from setuptools import setup, find_packages
 
 VERSION = (2, 4, 0)
@@ -20,7 +22,17 @@ __homepage__ = 'https://github.com/abhinavsingh/proxy.py'
 __download_url__ = '%s/archive/master.zip' % __homepage__
 __license__ = 'BSD'
 
+# Optionally compile hot path modules into C extensions using mypyc.
+# Pure python modules continue to work when extensions are absent.
+#
+#   PROXY_PY_MYPYC=1 python setup.py build_ext --inplace
+MYPYC_MODULES = ['proxy/http/parser.py']
+
 if __name__ == '__main__':
+    ext_modules = []
+    if os.environ.get('PROXY_PY_MYPYC', '0') == '1':
+        from mypyc.build import mypycify
+        ext_modules = mypycify(MYPYC_MODULES, opt_level='3')
     setup(
         name='proxy.py',
         version=__version__,
@@ -37,6 +49,7 @@ if __name__ == '__main__':
         zip_safe=False,
         packages=find_packages(exclude=['tests', 'tests.*']),
         package_data={'proxy': ['py.typed']},
+        ext_modules=ext_modules,
         install_requires=open('requirements.txt', 'r').read().strip().split(),
         entry_points={
             'console_scripts': [
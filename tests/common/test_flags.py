@@ -8,7 +8,7 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
-from proxy.common.utils import bytes_
+from proxy.common.utils import text_
 from proxy.common.constants import PLUGIN_HTTP_PROXY
 import unittest
 
@@ -88,7 +88,7 @@ class TestFlags(unittest.TestCase):
 
     def test_unique_plugin_from_bytes(self) -> None:
         self.flags = Proxy.initialize([], plugins=[
-            bytes_(PLUGIN_HTTP_PROXY),
+            PLUGIN_HTTP_PROXY,
         ])
         self.assert_plugins({'HttpProtocolHandlerPlugin': [
             HttpProxyPlugin,
@@ -96,7 +96,7 @@ class TestFlags(unittest.TestCase):
 
     def test_unique_plugin_from_args(self) -> None:
         self.flags = Proxy.initialize([
-            '--plugins', PLUGIN_HTTP_PROXY,
+            '--plugins', text_(PLUGIN_HTTP_PROXY),
         ])
         self.assert_plugins({'HttpProtocolHandlerPlugin': [
             HttpProxyPlugin,
@@ -14,7 +14,7 @@ from unittest import mock
 
 from proxy.common.constants import DEFAULT_IPV6_HOSTNAME, DEFAULT_IPV4_HOSTNAME, DEFAULT_PORT, DEFAULT_TIMEOUT
 from proxy.common.constants import DEFAULT_HTTP_PORT
-from proxy.common.utils import new_socket_connection, socket_connection
+from proxy.common.utils import as_bytes, new_socket_connection, socket_connection
 
 
 class TestSocketConnectionUtils(unittest.TestCase):
@@ -57,3 +57,19 @@ class TestSocketConnectionUtils(unittest.TestCase):
             self, mock_new_socket_connection: mock.Mock) -> None:
         with socket_connection(self.addr_ipv4) as conn:
             self.assertEqual(conn, mock_new_socket_connection.return_value)
+
+
+class TestAsBytes(unittest.TestCase):
+
+    def test_bytes_returned_as_is(self) -> None:
+        raw = b'hello world'
+        self.assertIs(as_bytes(raw), raw)
+
+    def test_memoryview_over_entire_bytes_not_copied(self) -> None:
+        raw = b'hello world'
+        self.assertIs(as_bytes(memoryview(raw)), raw)
+
+    def test_memoryview_slice_copied(self) -> None:
+        raw = memoryview(b'hello world')
+        self.assertEqual(as_bytes(raw[6:]), b'world')
+        self.assertEqual(as_bytes(memoryview(bytearray(b'hello'))), b'hello')
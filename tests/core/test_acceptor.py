@@ -97,4 +97,11 @@ class TestAcceptor(unittest.TestCase):
         mock_thread.assert_called_with(
             target=self.mock_protocol_handler.return_value.run)
         mock_thread.return_value.start.assert_called()
+        conn.setsockopt.assert_any_call(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # TCP_QUICKACK isn't sticky on Linux, setting it once has no effect
+        if hasattr(socket, 'TCP_QUICKACK'):
+            self.assertNotIn(
+                mock.call(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1),
+                conn.setsockopt.call_args_list)
         sock.close.assert_called()
@@ -8,6 +8,7 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
+import os
 import unittest
 import socket
 import ssl
@@ -16,7 +17,12 @@ from typing import Optional, Union
 
 from proxy.core.connection import tcpConnectionTypes, TcpConnectionUninitializedException
 from proxy.core.connection import TcpServerConnection, TcpConnection, TcpClientConnection
+from proxy.core.connection.bufpool import bufpool
+from proxy.core.connection.connection import IOV_MAX
 from proxy.common.constants import DEFAULT_IPV6_HOSTNAME, DEFAULT_PORT, DEFAULT_IPV4_HOSTNAME
+from proxy.common.constants import DEFAULT_TCP_NOTSENT_LOWAT
+
+from ..utils import mock_recv_into
 
 
 class TestTcpConnection(unittest.TestCase):
@@ -63,6 +69,116 @@ class TestTcpConnection(unittest.TestCase):
         self.conn.flush()
         self.assertTrue(not _conn.send.called)
 
+    def testRecvCopiesOutOfPooledBuffer(self) -> None:
+        _conn = mock.MagicMock()
+        _conn.recv_into.side_effect = mock_recv_into(b'hello')
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        data = self.conn.recv(1024)
+        assert data is not None
+        self.assertEqual(data, b'hello')
+        buf = _conn.recv_into.call_args[0][0]
+        self.assertIn(buf, bufpool.pool)
+        # Reusing pooled buffer must not affect previously received data
+        _conn.recv_into.side_effect = mock_recv_into(b'world')
+        self.assertEqual(self.conn.recv(1024), b'world')
+        self.assertIs(_conn.recv_into.call_args[0][0], buf)
+        self.assertEqual(data, b'hello')
+
+    def testRecvReturnsNoneOnConnectionClose(self) -> None:
+        _conn = mock.MagicMock()
+        _conn.recv_into.return_value = 0
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        self.assertIsNone(self.conn.recv())
+
+    def testFlushSendsQueuedMemoryviewWithoutCopy(self) -> None:
+        _conn = mock.MagicMock()
+        _conn.send.return_value = 4
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        data = b'hello world'
+        self.conn.queue(memoryview(data))
+        self.assertEqual(self.conn.flush(), 4)
+        sent = _conn.send.call_args[0][0]
+        self.assertIsInstance(sent, memoryview)
+        self.assertIs(sent.obj, data)
+        self.assertIs(self.conn.buffer[0].obj, data)
+        self.assertEqual(self.conn.buffer[0], b'o world')
+
+    @unittest.skipIf(not hasattr(socket.socket, 'sendmsg'),
+                     'socket.sendmsg is not available on this platform.')
+    def testFlushesMultipleBuffersUsingSendmsg(self) -> None:
+        _conn = mock.MagicMock()
+        _conn.sendmsg.return_value = 7
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        self.conn.queue(memoryview(b'head'))
+        self.conn.queue(memoryview(b'body'))
+        self.assertEqual(self.conn.flush(), 7)
+        _conn.sendmsg.assert_called_once_with([b'head', b'body'])
+        _conn.send.assert_not_called()
+        self.assertEqual(len(self.conn.buffer), 1)
+        self.assertEqual(self.conn.buffer[0], b'y')
+
+    @unittest.skipIf(not hasattr(socket.socket, 'sendmsg'),
+                     'socket.sendmsg is not available on this platform.')
+    def testFlushLimitsSendmsgToIovMaxBuffers(self) -> None:
+        left, right = socket.socketpair()
+        try:
+            left.setblocking(False)
+            right.setblocking(False)
+            self.conn = TestTcpConnection.TcpConnectionToTest(left)
+            for _ in range(IOV_MAX * 2):
+                self.conn.queue(memoryview(b'0123456789'))
+            received = 0
+            while self.conn.has_buffer():
+                self.conn.flush()
+                received += len(right.recv(IOV_MAX * 20))
+            self.assertEqual(received, IOV_MAX * 20)
+        finally:
+            left.close()
+            right.close()
+
+    @unittest.skipIf(not hasattr(socket, 'MSG_MORE'),
+                     'socket.MSG_MORE is not available on this platform.')
+    @mock.patch('proxy.core.connection.connection.DEFAULT_MAX_SEND_SIZE', 8)
+    def testFlushSetsMsgMoreOnlyWhileDataRemainsQueued(self) -> None:
+        _conn = mock.MagicMock()
+        _conn.sendmsg.side_effect = lambda iov, *args: sum(len(b) for b in iov)
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        self.conn.queue(memoryview(b'head'))
+        self.conn.queue(memoryview(b'body-body'))
+        self.assertEqual(self.conn.flush(), 8)
+        _conn.sendmsg.assert_called_with(
+            [b'head', b'body'], [], socket.MSG_MORE)
+        # Last remaining buffer is sent without MSG_MORE
+        _conn.send.return_value = 5
+        self.assertEqual(self.conn.flush(), 5)
+        _conn.send.assert_called_once_with(b'-body')
+        self.assertFalse(self.conn.has_buffer())
+
+    @unittest.skipIf(not hasattr(os, 'splice'),
+                     'os.splice is not available on this platform.')
+    def testSplicesBetweenConnectionsViaPipe(self) -> None:
+        src_peer, src = socket.socketpair()
+        dst, dst_peer = socket.socketpair()
+        pipe_r, pipe_w = os.pipe()
+        try:
+            src_conn = TestTcpConnection.TcpConnectionToTest(src)
+            dst_conn = TestTcpConnection.TcpConnectionToTest(dst)
+            self.assertTrue(src_conn.can_splice())
+            src_peer.sendall(b'hello')
+            self.assertEqual(src_conn.splice_to(pipe_w, 1024), 5)
+            self.assertEqual(dst_conn.splice_from(pipe_r, 5), 5)
+            self.assertEqual(dst_peer.recv(1024), b'hello')
+            # Nothing left to splice
+            with self.assertRaises(BlockingIOError):
+                src_conn.splice_to(pipe_w, 1024)
+            src_peer.close()
+            self.assertEqual(src_conn.splice_to(pipe_w, 1024), 0)
+        finally:
+            for s in (src, dst, dst_peer):
+                s.close()
+            os.close(pipe_r)
+            os.close(pipe_w)
+
     @mock.patch('socket.socket')
     def testTcpServerEstablishesIPv6Connection(
             self, mock_socket: mock.Mock) -> None:
@@ -83,6 +199,20 @@ class TestTcpConnection(unittest.TestCase):
         conn.connect()
         mock_new_socket_connection.assert_called_once()
 
+    @unittest.skipIf(not hasattr(socket, 'TCP_NOTSENT_LOWAT'),
+                     'TCP_NOTSENT_LOWAT is not available on this platform.')
+    @mock.patch('proxy.core.connection.server.new_socket_connection')
+    def testTcpServerSetsNotSentLowWatermark(
+            self,
+            mock_new_socket_connection: mock.Mock) -> None:
+        conn = TcpServerConnection(
+            str(DEFAULT_IPV4_HOSTNAME), DEFAULT_PORT)
+        conn.connect()
+        mock_new_socket_connection.return_value.setsockopt.assert_called_with(
+            socket.IPPROTO_TCP,
+            socket.TCP_NOTSENT_LOWAT,
+            DEFAULT_TCP_NOTSENT_LOWAT)
+
     @mock.patch('socket.socket')
     def testTcpServerEstablishesIPv4Connection(
             self, mock_socket: mock.Mock) -> None:
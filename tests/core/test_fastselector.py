@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+import socket
+import selectors
+import unittest
+
+from proxy.core.event import FastSelector
+
+
+class TestFastSelector(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.selector = FastSelector()
+        self.left, self.right = socket.socketpair()
+
+    def tearDown(self) -> None:
+        self.selector.close()
+        self.left.close()
+        self.right.close()
+
+    def test_select_returns_registered_fileobj(self) -> None:
+        self.selector.register(self.left, selectors.EVENT_READ)
+        self.assertEqual(self.selector.select(timeout=0), [])
+        self.right.send(b'hello')
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_READ)])
+
+    def test_modify_and_unregister(self) -> None:
+        self.selector.register(self.left.fileno(), selectors.EVENT_READ)
+        self.selector.modify(self.left.fileno(), selectors.EVENT_WRITE)
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left.fileno(), selectors.EVENT_WRITE)])
+        self.selector.unregister(self.left.fileno())
+        self.assertEqual(self.selector.select(timeout=0), [])
+
+    def test_unregister_detached_socket(self) -> None:
+        # ssl.wrap_socket detaches the socket it wraps, which
+        # may still be registered at that time.
+        self.selector.register(self.left, selectors.EVENT_READ)
+        fd = self.left.detach()
+        self.selector.unregister(self.left)
+        self.left = socket.socket(fileno=fd)
+        self.selector.register(self.left, selectors.EVENT_WRITE)
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_WRITE)])
+
+    def test_unregister_closed_socket(self) -> None:
+        self.selector.register(self.left, selectors.EVENT_READ)
+        fd = self.left.fileno()
+        self.left.close()
+        self.selector.unregister(fd)
+        self.assertEqual(self.selector.fileobjs, {})
+
+    def test_select_reports_only_registered_events(self) -> None:
+        self.selector.register(self.left, selectors.EVENT_READ)
+        self.right.close()
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_READ)])
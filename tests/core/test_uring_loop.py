@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+import time
+import socket
+import selectors
+import unittest
+
+from proxy.core.event import UringSelector, URING_SUPPORTED
+
+
+@unittest.skipIf(not URING_SUPPORTED, 'liburing is not installed.')
+class TestUringSelector(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.selector = UringSelector()
+        self.left, self.right = socket.socketpair()
+
+    def tearDown(self) -> None:
+        self.selector.close()
+        self.left.close()
+        self.right.close()
+
+    def test_select_returns_registered_fileobj(self) -> None:
+        self.selector.register(self.left, selectors.EVENT_READ)
+        self.assertEqual(self.selector.select(timeout=0), [])
+        self.right.send(b'hello')
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_READ)])
+        # One-shot poll is re-armed while descriptor stays registered
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_READ)])
+
+    def test_modify_and_unregister(self) -> None:
+        self.selector.register(self.left.fileno(), selectors.EVENT_READ)
+        self.selector.modify(self.left.fileno(), selectors.EVENT_WRITE)
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left.fileno(), selectors.EVENT_WRITE)])
+        self.selector.unregister(self.left.fileno())
+        self.assertEqual(self.selector.select(timeout=0), [])
+
+    def test_reregister_ignores_stale_completions(self) -> None:
+        # Same pattern as HttpProtocolHandler, which registers
+        # and unregisters all descriptors around every select.
+        for _ in range(3):
+            self.selector.register(self.left, selectors.EVENT_READ)
+            self.selector.register(self.right, selectors.EVENT_WRITE)
+            self.assertEqual(
+                self.selector.select(timeout=1),
+                [(self.right, selectors.EVENT_WRITE)])
+            self.selector.unregister(self.left)
+            self.selector.unregister(self.right)
+        self.right.send(b'hello')
+        self.selector.register(self.left, selectors.EVENT_READ)
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_READ)])
+
+    def test_idle_select_blocks_until_timeout(self) -> None:
+        # Polls of descriptors registered again with same events are kept
+        # armed.  Previously they were removed and re-added, and completions
+        # of removals woke up every select immediately.
+        for _ in range(3):
+            self.selector.register(self.left, selectors.EVENT_READ)
+            start = time.monotonic()
+            self.assertEqual(self.selector.select(timeout=0.5), [])
+            self.assertGreaterEqual(time.monotonic() - start, 0.4)
+            self.selector.unregister(self.left)
+
+    def test_completions_are_reaped_across_ring_wrap(self) -> None:
+        self.selector.close()
+        self.selector = UringSelector(entries=4)
+        self.selector.register(self.left, selectors.EVENT_READ)
+        for i in range(32):
+            events = selectors.EVENT_WRITE if i % 2 else selectors.EVENT_READ
+            self.selector.register(self.right, events)
+            self.right.send(b'x')
+            ready = self.selector.select(timeout=1)
+            self.assertIn((self.left, selectors.EVENT_READ), ready)
+            self.left.recv(1)
+            self.selector.unregister(self.right)
+
+    def test_unregister_detached_socket(self) -> None:
+        self.selector.register(self.left, selectors.EVENT_READ)
+        fd = self.left.detach()
+        self.selector.unregister(self.left)
+        self.left = socket.socket(fileno=fd)
+        self.selector.register(self.left, selectors.EVENT_WRITE)
+        self.assertEqual(
+            self.selector.select(timeout=1),
+            [(self.left, selectors.EVENT_WRITE)])
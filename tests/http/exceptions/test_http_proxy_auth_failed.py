@@ -18,10 +18,12 @@ from proxy.http.handler import HttpProtocolHandler
 from proxy.core.connection import TcpClientConnection
 from proxy.common.utils import build_http_request
 
+from ...utils import mock_recv_into
+
 
 class TestHttpProxyAuthFailed(unittest.TestCase):
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self,
               mock_fromfd: mock.Mock,
@@ -40,61 +42,45 @@ class TestHttpProxyAuthFailed(unittest.TestCase):
 
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_proxy_auth_fails_without_cred(self, mock_server_conn: mock.Mock) -> None:
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host'
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_not_called()
-        self.assertEqual(self.protocol_handler.client.has_buffer(), True)
-        self.assertEqual(
-            self.protocol_handler.client.buffer[0], ProxyAuthenticationFailed.RESPONSE_PKT)
-        self._conn.send.assert_not_called()
+        self._conn.send.assert_called_once_with(
+            ProxyAuthenticationFailed.RESPONSE_PKT)
 
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_proxy_auth_fails_with_invalid_cred(self, mock_server_conn: mock.Mock) -> None:
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host',
                 b'Proxy-Authorization': b'Basic hello',
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_not_called()
-        self.assertEqual(self.protocol_handler.client.has_buffer(), True)
-        self.assertEqual(
-            self.protocol_handler.client.buffer[0], ProxyAuthenticationFailed.RESPONSE_PKT)
-        self._conn.send.assert_not_called()
+        self._conn.send.assert_called_once_with(
+            ProxyAuthenticationFailed.RESPONSE_PKT)
 
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_proxy_auth_works_with_valid_cred(self, mock_server_conn: mock.Mock) -> None:
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host',
                 b'Proxy-Authorization': b'Basic dXNlcjpwYXNz',
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_called_once()
@@ -102,18 +88,14 @@ class TestHttpProxyAuthFailed(unittest.TestCase):
 
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_proxy_auth_works_with_mixed_case_basic_string(self, mock_server_conn: mock.Mock) -> None:
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host',
                 b'Proxy-Authorization': b'bAsIc dXNlcjpwYXNz',
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_called_once()
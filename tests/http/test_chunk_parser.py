@@ -34,6 +34,24 @@ class TestChunkParser(unittest.TestCase):
         self.assertEqual(self.parser.body, b'Wikipedia in\r\n\r\nchunks.')
         self.assertEqual(self.parser.state, chunkParserStates.COMPLETE)
 
+    def test_chunk_parse_memoryview(self) -> None:
+        raw = memoryview(b''.join([
+            b'4\r\n',
+            b'Wiki\r\n',
+            b'5\r\n',
+            b'pedia\r\n',
+            b'0\r\n',
+            b'\r\n',
+            b'HTTP/1.1 200 OK',
+        ]))
+        remaining = self.parser.parse(raw[:5])
+        self.assertEqual(remaining, b'')
+        self.assertEqual(self.parser.chunk, b'Wi')
+        remaining = self.parser.parse(raw[5:])
+        self.assertEqual(self.parser.body, b'Wikipedia')
+        self.assertEqual(self.parser.state, chunkParserStates.COMPLETE)
+        self.assertEqual(remaining, b'HTTP/1.1 200 OK')
+
     def test_chunk_parse_issue_27(self) -> None:
         """Case when data ends with the chunk size but without ending CRLF."""
         self.parser.parse(b'3')
@@ -12,6 +12,8 @@ import unittest
 
 from proxy.common.constants import CRLF
 from proxy.common.utils import build_http_request, find_http_line, build_http_response, build_http_header, bytes_
+from proxy.common.utils import compile_http_response_template
+from proxy.common.utils import render_http_response_template
 from proxy.http.methods import httpMethods
 from proxy.http.codes import httpStatusCodes
 from proxy.http.parser import HttpParser, httpParserTypes, httpParserStates
@@ -83,6 +85,16 @@ class TestHttpParser(unittest.TestCase):
                 CRLF
             ]) + body)
 
+    def test_render_response_template(self) -> None:
+        headers = {b'Content-Type': b'text/plain', b'Connection': b'close'}
+        template = compile_http_response_template(
+            200, reason=b'OK', headers=headers)
+        for body in (b'', b'Hello world!!!'):
+            self.assertEqual(
+                render_http_response_template(template, len(body), body),
+                build_http_response(
+                    200, reason=b'OK', headers=dict(headers), body=body))
+
     def test_build_header(self) -> None:
         self.assertEqual(
             build_http_header(
@@ -97,6 +109,33 @@ class TestHttpParser(unittest.TestCase):
         self.assertFalse(self.parser.has_header(b'not-found'))
         self.assertTrue(self.parser.has_header(b'key'))
 
+    def test_headers_mapping_is_read_only(self) -> None:
+        self.parser.add_header(b'Host', b'example.com')
+        with self.assertRaises(TypeError):
+            self.parser.headers[b'host'] = (b'Host', b'proxy.py')     # type: ignore[index]
+        with self.assertRaises(TypeError):
+            del self.parser.headers[b'host']    # type: ignore[attr-defined]
+        self.assertEqual(self.parser.header(b'host'), b'example.com')
+
+    def test_del_header_keeps_remaining_headers_in_order(self) -> None:
+        self.parser.add_headers([
+            (b'Host', b'example.com'),
+            (b'Accept', b'*/*'),
+            (b'User-Agent', b'proxy.py'),
+        ])
+        self.parser.add_header(b'accept', b'text/html')
+        self.parser.del_header(b'HOST')
+        self.assertEqual(self.parser.header_names, [b'accept', b'User-Agent'])
+        self.assertEqual(self.parser.header_values, [b'text/html', b'proxy.py'])
+        self.assertFalse(self.parser.has_header(b'host'))
+        self.assertEqual(self.parser.header(b'User-Agent'), b'proxy.py')
+        self.parser.add_header(b'Host', b'example.org')
+        self.assertEqual(self.parser.headers, {
+            b'accept': (b'accept', b'text/html'),
+            b'user-agent': (b'User-Agent', b'proxy.py'),
+            b'host': (b'Host', b'example.org'),
+        })
+
     def test_set_host_port_raises(self) -> None:
         with self.assertRaises(KeyError):
             self.parser.set_line_attributes()
@@ -187,7 +226,7 @@ class TestHttpParser(unittest.TestCase):
         self.parser.parse(host_hdr)
         self.assertEqual(self.parser.total_size,
                          len(pkt) + len(CRLF) + len(host_hdr))
-        self.assertDictEqual(self.parser.headers, {})
+        self.assertEqual(self.parser.headers, {})
         self.assertEqual(self.parser.buffer, b'Host: localhost:8080')
         self.assertEqual(self.parser.state, httpParserStates.LINE_RCVD)
 
@@ -234,6 +273,25 @@ class TestHttpParser(unittest.TestCase):
         self.parser.parse(CRLF)
         self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
 
+    def test_multiple_headers_parsed_in_single_pass(self) -> None:
+        self.parser.parse(CRLF.join([
+            b'GET http://localhost:8080 HTTP/1.1',
+            b'Host: localhost:8080',
+            b'Accept: */*',
+            b'User-Agent: proxy.py',
+            b'Connection: ',
+        ]))
+        self.assertEqual(self.parser.state, httpParserStates.RCVING_HEADERS)
+        self.assertEqual(self.parser.header(b'accept'), b'*/*')
+        self.assertEqual(self.parser.header(b'user-agent'), b'proxy.py')
+        self.assertFalse(self.parser.has_header(b'connection'))
+        self.assertEqual(self.parser.buffer, b'Connection: ')
+
+        self.parser.parse(b'close' + CRLF * 2)
+        self.assertEqual(self.parser.header(b'connection'), b'close')
+        self.assertEqual(self.parser.buffer, b'')
+        self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
+
     def test_post_full_parse(self) -> None:
         raw = CRLF.join([
             b'POST %s HTTP/1.1',
@@ -444,6 +502,33 @@ class TestHttpParser(unittest.TestCase):
         self.assertEqual(self.parser.body, b'Wikipedia in\r\n\r\nchunks.')
         self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
 
+    def test_parse_memoryview(self) -> None:
+        raw = build_http_request(
+            b'POST', b'http://localhost',
+            headers={b'Content-Length': b'7'},
+            body=b'a=b&c=d')
+        self.parser.parse(memoryview(raw[:-3]))
+        self.assertEqual(self.parser.state, httpParserStates.RCVING_BODY)
+        self.assertEqual(self.parser.body, b'a=b&')
+        self.parser.parse(memoryview(raw[-3:] + b'GET'))
+        self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
+        self.assertEqual(self.parser.body, b'a=b&c=d')
+        self.assertIsInstance(self.parser.body, bytes)
+        self.assertEqual(self.parser.buffer, b'GET')
+        self.assertIsInstance(self.parser.buffer, bytes)
+
+    def test_parse_memoryview_partial_headers(self) -> None:
+        raw = memoryview(build_http_request(
+            b'GET', b'http://localhost',
+            headers={b'Host': b'localhost', b'Accept': b'*/*'}))
+        self.parser.parse(raw[:50])
+        self.assertEqual(self.parser.state, httpParserStates.RCVING_HEADERS)
+        self.assertIsInstance(self.parser.buffer, bytes)
+        self.parser.parse(raw[50:])
+        self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
+        self.assertEqual(self.parser.header(b'accept'), b'*/*')
+        self.assertEqual(self.parser.buffer, b'')
+
     def test_pipelined_response_parse(self) -> None:
         response = build_http_response(
             httpStatusCodes.OK, reason=b'OK',
@@ -536,3 +621,16 @@ class TestHttpParser(unittest.TestCase):
         self.parser = HttpParser(httpParserTypes.RESPONSE_PARSER)
         self.parser.parse(response)
         self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
+
+    def test_reset(self) -> None:
+        self.parser.parse(build_http_request(
+            httpMethods.POST, b'http://localhost',
+            headers={b'Content-Length': b'3'}, body=b'a=b'))
+        self.assertEqual(self.parser.state, httpParserStates.COMPLETE)
+        self.parser.reset(httpParserTypes.RESPONSE_PARSER)
+        self.assertEqual(self.parser.type, httpParserTypes.RESPONSE_PARSER)
+        self.assertEqual(self.parser.state, httpParserStates.INITIALIZED)
+        self.assertEqual(self.parser.headers, {})
+        self.assertIsNone(self.parser.body)
+        self.assertIsNone(self.parser.method)
+        self.assertEqual(self.parser.total_size, 0)
@@ -8,22 +8,28 @@
     :copyright: (c) 2013-present by Abhinav Singh and contributors.
     :license: BSD, see LICENSE for more details.
 """
+import os
+import uuid
+import socket
 import unittest
 import selectors
 from unittest import mock
 
 from proxy.common.constants import DEFAULT_HTTP_PORT
 from proxy.proxy import Proxy
-from proxy.core.connection import TcpClientConnection
+from proxy.core.connection import TcpClientConnection, TcpServerConnection
 from proxy.http.proxy import HttpProxyPlugin
 from proxy.http.handler import HttpProtocolHandler
 from proxy.http.exception import HttpProtocolException
+from proxy.http.parser import HttpParser, httpParserTypes
 from proxy.common.utils import build_http_request
 
+from ..utils import mock_recv_into
+
 
 class TestHttpProxyPlugin(unittest.TestCase):
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self,
               mock_fromfd: mock.Mock,
@@ -55,17 +61,13 @@ class TestHttpProxyPlugin(unittest.TestCase):
         self.plugin.return_value.before_upstream_connection.side_effect = lambda r: r
         self.plugin.return_value.handle_client_request.side_effect = lambda r: r
 
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host'
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_called_with('upstream.host', DEFAULT_HTTP_PORT)
@@ -78,18 +80,75 @@ class TestHttpProxyPlugin(unittest.TestCase):
             mock_server_conn: mock.Mock) -> None:
         self.plugin.return_value.before_upstream_connection.side_effect = HttpProtocolException()
 
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://upstream.host/not-found.html',
             headers={
                 b'Host': b'upstream.host'
-            })
+            }))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         self.plugin.return_value.before_upstream_connection.assert_called()
         mock_server_conn.assert_not_called()
+
+
+@unittest.skipIf(not hasattr(os, 'splice'),
+                 'os.splice is not available on this platform.')
+class TestHttpProxyPluginSplice(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.client_peer, client = socket.socketpair()
+        server, self.server_peer = socket.socketpair()
+        client.setblocking(False)
+        server.setblocking(False)
+
+        self.request = HttpParser(httpParserTypes.REQUEST_PARSER)
+        self.request.parse(build_http_request(
+            b'CONNECT', b'upstream.host:443',
+            headers={b'Host': b'upstream.host:443'}))
+        self.client = TcpClientConnection(client, ('127.0.0.1', 54382))
+        self.plugin = HttpProxyPlugin(
+            uuid.uuid4(), Proxy.initialize(), self.client,
+            self.request, mock.MagicMock())
+        self.plugin.server = TcpServerConnection('upstream.host', 443)
+        self.plugin.server._conn = server
+
+    def tearDown(self) -> None:
+        self.plugin.on_client_connection_close()
+        self.client.connection.close()
+        self.client_peer.close()
+        self.server_peer.close()
+
+    def test_upstream_data_spliced_into_client(self) -> None:
+        assert self.plugin.server is not None
+        self.assertTrue(self.plugin.can_splice())
+        self.server_peer.sendall(b'opaque tls bytes')
+        self.assertFalse(self.plugin.read_from_descriptors(
+            [self.plugin.server.connection]))
+        self.assertFalse(self.client.has_buffer())
+        self.assertEqual(self.plugin.splice_pending, 0)
+        self.assertEqual(self.plugin.response.total_size, 16)
+        self.assertEqual(self.client_peer.recv(1024), b'opaque tls bytes')
+
+    def test_pending_spliced_data_pauses_upstream_reads(self) -> None:
+        assert self.plugin.server is not None
+        self.plugin.splice_pipe = os.pipe()
+        os.write(self.plugin.splice_pipe[1], b'pending')
+        self.plugin.splice_pending = 7
+        self.assertTrue(self.plugin.has_pending())
+        r, w = self.plugin.get_descriptors()
+        self.assertEqual(r, [])
+        self.assertEqual(w, [self.client.connection])
+        self.assertFalse(self.plugin.write_to_descriptors([self.client.connection]))
+        self.assertEqual(self.plugin.splice_pending, 0)
+        self.assertFalse(self.plugin.has_pending())
+        self.assertEqual(self.client_peer.recv(1024), b'pending')
+        r, w = self.plugin.get_descriptors()
+        self.assertEqual(r, [self.plugin.server.connection])
+
+    def test_upstream_close_tears_down(self) -> None:
+        assert self.plugin.server is not None
+        self.server_peer.close()
+        self.assertTrue(self.plugin.read_from_descriptors(
+            [self.plugin.server.connection]))
@@ -24,6 +24,8 @@ from proxy.http.methods import httpMethods
 from proxy.common.utils import build_http_request, bytes_
 from proxy.proxy import Proxy
 
+from ..utils import mock_recv_into
+
 
 class TestHttpProxyTlsInterception(unittest.TestCase):
 
@@ -33,7 +35,7 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
     @mock.patch('proxy.http.proxy.server.gen_public_key')
     @mock.patch('proxy.http.proxy.server.gen_csr')
     @mock.patch('proxy.http.proxy.server.sign_csr')
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_e2e(
             self,
@@ -112,7 +114,7 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
             headers={
                 b'Host': bytes_(netloc),
             })
-        self._conn.recv.return_value = connect_request
+        self._conn.recv_into.side_effect = mock_recv_into(connect_request)
 
         # Prepare mocked HttpProtocolHandlerPlugin
         self.plugin.return_value.get_descriptors.return_value = ([], [])
@@ -128,11 +130,7 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
         self.proxy_plugin.return_value.handle_client_request.side_effect = lambda r: r
 
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
 
@@ -10,7 +10,9 @@
 """
 import unittest
 import selectors
+import socket
 import base64
+import time
 
 from typing import cast
 from unittest import mock
@@ -26,10 +28,12 @@ from proxy.http.parser import httpParserStates, httpParserTypes
 from proxy.http.exception import ProxyAuthenticationFailed, ProxyConnectionFailed
 from proxy.http.handler import HttpProtocolHandler
 
+from ..utils import mock_recv_into
+
 
 class TestHttpProtocolHandler(unittest.TestCase):
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self,
               mock_fromfd: mock.Mock,
@@ -41,8 +45,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
         self.http_server_port = 65535
         self.flags = Proxy.initialize()
         self.flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
 
         self.mock_selector = mock_selector
@@ -50,6 +54,48 @@ class TestHttpProtocolHandler(unittest.TestCase):
             TcpClientConnection(self._conn, self._addr), flags=self.flags)
         self.protocol_handler.initialize()
 
+    def test_plugins_frozen_on_initialize(self) -> None:
+        plugins = tuple(self.protocol_handler.plugins.values())
+        self.assertEqual(
+            [p.name() for p in plugins],
+            ['HttpProxyPlugin', 'HttpWebServerPlugin'])
+        self.assertEqual(self.protocol_handler._plugins, plugins)
+        self.assertEqual(
+            self.protocol_handler._read_from_descriptors_callbacks,
+            tuple(p.read_from_descriptors for p in plugins))
+        self.assertEqual(
+            self.protocol_handler._write_to_descriptors_callbacks,
+            tuple(p.write_to_descriptors for p in plugins))
+
+    @mock.patch('proxy.http.handler.URING_SUPPORTED', True)
+    @mock.patch('proxy.http.handler.UringSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
+    def test_uring_setup_failure_falls_back_to_selector(
+            self, mock_fast_selector: mock.Mock, mock_uring_selector: mock.Mock) -> None:
+        flags = Proxy.initialize(event_backend='uring')
+        mock_uring_selector.side_effect = OSError(12, 'Cannot allocate memory')
+        handler = HttpProtocolHandler(
+            TcpClientConnection(self._conn, self._addr), flags=flags)
+        mock_uring_selector.assert_called_once()
+        self.assertIs(handler.selector, mock_fast_selector.return_value)
+
+    @mock.patch('proxy.http.handler.URING_SUPPORTED', True)
+    @mock.patch('proxy.http.handler.UringSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
+    def test_uring_not_used_in_threadless_mode(
+            self, mock_fast_selector: mock.Mock, mock_uring_selector: mock.Mock) -> None:
+        flags = Proxy.initialize(event_backend='uring', threadless=True)
+        handler = HttpProtocolHandler(
+            TcpClientConnection(self._conn, self._addr), flags=flags)
+        mock_uring_selector.assert_not_called()
+        self.assertIs(handler.selector, mock_fast_selector.return_value)
+
+    def test_not_inactive_while_plugin_has_pending_data(self) -> None:
+        self.protocol_handler.last_activity = time.time() - self.flags.timeout - 1
+        self.assertTrue(self.protocol_handler.is_inactive())
+        with mock.patch.object(HttpProxyPlugin, 'has_pending', return_value=True):
+            self.assertFalse(self.protocol_handler.is_inactive())
+
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_http_get(self, mock_server_connection: mock.Mock) -> None:
         server = mock_server_connection.return_value
@@ -60,8 +106,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
 
         # Send request line
         assert self.http_server_port is not None
-        self._conn.recv.return_value = (b'GET http://localhost:%d HTTP/1.1' %
-                                        self.http_server_port) + CRLF
+        self._conn.recv_into.side_effect = mock_recv_into(
+            (b'GET http://localhost:%d HTTP/1.1' % self.http_server_port) + CRLF)
         self.protocol_handler.run_once()
         self.assertEqual(
             self.protocol_handler.request.state,
@@ -72,24 +118,28 @@ class TestHttpProtocolHandler(unittest.TestCase):
 
         # Send headers and blank line, thus completing HTTP request
         assert self.http_server_port is not None
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'User-Agent: proxy.py/%s' % bytes_(__version__),
             b'Host: localhost:%d' % self.http_server_port,
             b'Accept: */*',
             b'Proxy-Connection: Keep-Alive',
             CRLF
-        ])
+        ]))
         self.assert_data_queued(mock_server_connection, server)
+        server.connection.setsockopt.assert_any_call(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.protocol_handler.run_once()
         server.flush.assert_called_once()
 
     def assert_tunnel_response(
             self, mock_server_connection: mock.Mock, server: mock.Mock) -> None:
+        self._conn.send.side_effect = lambda data: len(data)
         self.protocol_handler.run_once()
         self.assertTrue(
             cast(HttpProxyPlugin, self.protocol_handler.plugins['HttpProxyPlugin']).server is not None)
-        self.assertEqual(
-            self.protocol_handler.client.buffer[0],
+        # Tunnel established response is dispatched within the same pass
+        self.assertFalse(self.protocol_handler.client.has_buffer())
+        self._conn.send.assert_called_once_with(
             HttpProxyPlugin.PROXY_TUNNEL_ESTABLISHED_RESPONSE_PKT)
         mock_server_connection.assert_called_once()
         server.connect.assert_called_once()
@@ -97,7 +147,7 @@ class TestHttpProtocolHandler(unittest.TestCase):
         server.closed = False
 
         parser = HttpParser(httpParserTypes.RESPONSE_PARSER)
-        parser.parse(self.protocol_handler.client.buffer[0].tobytes())
+        parser.parse(self._conn.send.call_args[0][0])
         self.assertEqual(parser.state, httpParserStates.COMPLETE)
         assert parser.code is not None
         self.assertEqual(int(parser.code), 200)
@@ -111,41 +161,18 @@ class TestHttpProtocolHandler(unittest.TestCase):
             return cast(bool, server.queue.called)
 
         server.has_buffer.side_effect = has_buffer
-        self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ],
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=0,
-                data=None), selectors.EVENT_WRITE), ],
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ],
-            [(selectors.SelectorKey(
-                fileobj=server.connection,
-                fd=server.connection.fileno,
-                events=0,
-                data=None), selectors.EVENT_WRITE), ],
-        ]
+        self.mock_selector_for_client_read_read_server_write(
+            self.mock_selector, server)
 
         assert self.http_server_port is not None
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'CONNECT localhost:%d HTTP/1.1' % self.http_server_port,
             b'Host: localhost:%d' % self.http_server_port,
             b'User-Agent: proxy.py/%s' % bytes_(__version__),
             b'Proxy-Connection: Keep-Alive',
             CRLF
-        ])
+        ]))
         self.assert_tunnel_response(mock_server_connection, server)
-
-        # Dispatch tunnel established response to client
-        self.protocol_handler.run_once()
         self.assert_data_queued_to_server(server)
 
         self.protocol_handler.run_once()
@@ -154,17 +181,38 @@ class TestHttpProtocolHandler(unittest.TestCase):
 
     def test_proxy_connection_failed(self) -> None:
         self.mock_selector_for_client_read(self.mock_selector)
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'GET http://unknown.domain HTTP/1.1',
             b'Host: unknown.domain',
             CRLF
-        ])
+        ]))
         self.protocol_handler.run_once()
-        self.assertEqual(
-            self.protocol_handler.client.buffer[0],
+        self._conn.send.assert_called_once_with(
             ProxyConnectionFailed.RESPONSE_PKT)
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('socket.fromfd')
+    def test_request_parser_reused_after_shutdown(
+            self, mock_fromfd: mock.Mock) -> None:
+        request = self.protocol_handler.request
+        request.parse(CRLF.join([
+            b'POST http://localhost HTTP/1.1',
+            b'Content-Length: 5',
+            CRLF,
+        ]) + b'hello')
+        self.assertEqual(request.state, httpParserStates.COMPLETE)
+        self.protocol_handler.shutdown()
+        # Pooled parser must not keep previous request data alive
+        self.assertIsNone(request.body)
+        self.assertEqual(request.buffer, b'')
+        protocol_handler = HttpProtocolHandler(
+            TcpClientConnection(mock_fromfd.return_value, self._addr),
+            flags=self.flags)
+        self.assertIs(protocol_handler.request, request)
+        self.assertEqual(
+            protocol_handler.request.state,
+            httpParserStates.INITIALIZED)
+
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_proxy_authentication_failed(
             self,
@@ -175,24 +223,23 @@ class TestHttpProtocolHandler(unittest.TestCase):
         flags = Proxy.initialize(
             auth_code=base64.b64encode(b'user:pass'))
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
-            bytes_(PLUGIN_PROXY_AUTH),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
+            PLUGIN_PROXY_AUTH,
         ])
         self.protocol_handler = HttpProtocolHandler(
             TcpClientConnection(self._conn, self._addr), flags=flags)
         self.protocol_handler.initialize()
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'GET http://abhinavsingh.com HTTP/1.1',
             b'Host: abhinavsingh.com',
             CRLF
-        ])
+        ]))
         self.protocol_handler.run_once()
-        self.assertEqual(
-            self.protocol_handler.client.buffer[0],
+        self._conn.send.assert_called_once_with(
             ProxyAuthenticationFailed.RESPONSE_PKT)
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_authenticated_proxy_http_get(
@@ -209,8 +256,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
         flags = Proxy.initialize(
             auth_code=base64.b64encode(b'user:pass'))
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
 
         self.protocol_handler = HttpProtocolHandler(
@@ -218,30 +265,30 @@ class TestHttpProtocolHandler(unittest.TestCase):
         self.protocol_handler.initialize()
         assert self.http_server_port is not None
 
-        self._conn.recv.return_value = b'GET http://localhost:%d HTTP/1.1' % self.http_server_port
+        self._conn.recv_into.side_effect = mock_recv_into(b'GET http://localhost:%d HTTP/1.1' % self.http_server_port)
         self.protocol_handler.run_once()
         self.assertEqual(
             self.protocol_handler.request.state,
             httpParserStates.INITIALIZED)
 
-        self._conn.recv.return_value = CRLF
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF)
         self.protocol_handler.run_once()
         self.assertEqual(
             self.protocol_handler.request.state,
             httpParserStates.LINE_RCVD)
 
         assert self.http_server_port is not None
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'User-Agent: proxy.py/%s' % bytes_(__version__),
             b'Host: localhost:%d' % self.http_server_port,
             b'Accept: */*',
             b'Proxy-Connection: Keep-Alive',
             b'Proxy-Authorization: Basic dXNlcjpwYXNz',
             CRLF
-        ])
+        ]))
         self.assert_data_queued(mock_server_connection, server)
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     @mock.patch('proxy.http.proxy.server.TcpServerConnection')
     def test_authenticated_proxy_http_tunnel(
@@ -258,8 +305,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
         flags = Proxy.initialize(
             auth_code=base64.b64encode(b'user:pass'))
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER)
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER
         ])
 
         self.protocol_handler = HttpProtocolHandler(
@@ -267,16 +314,15 @@ class TestHttpProtocolHandler(unittest.TestCase):
         self.protocol_handler.initialize()
 
         assert self.http_server_port is not None
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'CONNECT localhost:%d HTTP/1.1' % self.http_server_port,
             b'Host: localhost:%d' % self.http_server_port,
             b'User-Agent: proxy.py/%s' % bytes_(__version__),
             b'Proxy-Connection: Keep-Alive',
             b'Proxy-Authorization: Basic dXNlcjpwYXNz',
             CRLF
-        ])
+        ]))
         self.assert_tunnel_response(mock_server_connection, server)
-        self.protocol_handler.client.flush()
         self.assert_data_queued_to_server(server)
 
         self.protocol_handler.run_once()
@@ -285,21 +331,9 @@ class TestHttpProtocolHandler(unittest.TestCase):
     def mock_selector_for_client_read_read_server_write(
             self, mock_selector: mock.Mock, server: mock.Mock) -> None:
         mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ],
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=0,
-                data=None), selectors.EVENT_READ), ],
-            [(selectors.SelectorKey(
-                fileobj=server.connection,
-                fd=server.connection.fileno,
-                events=0,
-                data=None), selectors.EVENT_WRITE), ],
+            [(self._conn, selectors.EVENT_READ), ],
+            [(self._conn, selectors.EVENT_READ), ],
+            [(server.connection, selectors.EVENT_WRITE), ],
         ]
 
     def assert_data_queued(
@@ -336,7 +370,7 @@ class TestHttpProtocolHandler(unittest.TestCase):
             CRLF
         ])
 
-        self._conn.recv.return_value = pkt
+        self._conn.recv_into.side_effect = mock_recv_into(pkt)
         self.protocol_handler.run_once()
 
         server.queue.assert_called_once_with(pkt)
@@ -344,9 +378,5 @@ class TestHttpProtocolHandler(unittest.TestCase):
         server.flush.assert_not_called()
 
     def mock_selector_for_client_read(self, mock_selector: mock.Mock) -> None:
-        mock_selector.return_value.select.return_value = [(
-            selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ]
+        mock_selector.return_value.select.return_value = [
+            (self._conn, selectors.EVENT_READ), ]
@@ -9,11 +9,13 @@
     :license: BSD, see LICENSE for more details.
 """
 import gzip
+import mmap
 import os
 import tempfile
 import unittest
 import selectors
 from unittest import mock
+from typing import Dict, Optional
 
 from proxy.proxy import Proxy
 from proxy.core.connection import TcpClientConnection
@@ -21,12 +23,16 @@ from proxy.http.handler import HttpProtocolHandler
 from proxy.http.parser import httpParserStates
 from proxy.common.utils import build_http_response, build_http_request, bytes_, text_
 from proxy.common.constants import CRLF, PLUGIN_HTTP_PROXY, PLUGIN_PAC_FILE, PLUGIN_WEB_SERVER, PROXY_PY_DIR
+from proxy.common.constants import DEFAULT_MAX_CACHED_FILE_SIZE
 from proxy.http.server import HttpWebServerPlugin
+from proxy.http.server.web import SENDFILE_SUPPORTED
+
+from ..utils import mock_recv_into
 
 
 class TestWebServerPlugin(unittest.TestCase):
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
         self.fileno = 10
@@ -35,15 +41,15 @@ class TestWebServerPlugin(unittest.TestCase):
         self.mock_selector = mock_selector
         self.flags = Proxy.initialize()
         self.flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
         self.protocol_handler = HttpProtocolHandler(
             TcpClientConnection(self._conn, self._addr),
             flags=self.flags)
         self.protocol_handler.initialize()
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_pac_file_served_from_disk(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
@@ -66,7 +72,7 @@ class TestWebServerPlugin(unittest.TestCase):
                 }, body=f.read()
             ))
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_pac_file_served_from_buffer(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
@@ -85,44 +91,294 @@ class TestWebServerPlugin(unittest.TestCase):
             }, body=pac_file_content
         ))
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_default_web_server_returns_404(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
         self._conn = mock_fromfd.return_value
-        mock_selector.return_value.select.return_value = [(
-            selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ]
+        mock_selector.return_value.select.return_value = [
+            (self._conn, selectors.EVENT_READ), ]
         flags = Proxy.initialize()
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
         self.protocol_handler = HttpProtocolHandler(
             TcpClientConnection(self._conn, self._addr),
             flags=flags)
         self.protocol_handler.initialize()
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'GET /hello HTTP/1.1',
             CRLF,
-        ])
+        ]))
         self.protocol_handler.run_once()
         self.assertEqual(
             self.protocol_handler.request.state,
             httpParserStates.COMPLETE)
+        self._conn.send.assert_called_once_with(
+            HttpWebServerPlugin.DEFAULT_404_RESPONSE)
+
+    @mock.patch('proxy.http.handler.FastSelector')
+    @mock.patch('socket.fromfd')
+    def test_response_stays_queued_when_client_not_writable(
+            self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
+        self._conn = mock_fromfd.return_value
+        self._conn.send.side_effect = BlockingIOError()
+        mock_selector.return_value.select.return_value = [
+            (self._conn, selectors.EVENT_READ), ]
+        flags = Proxy.initialize()
+        flags.plugins = Proxy.load_plugins([
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
+        ])
+        self.protocol_handler = HttpProtocolHandler(
+            TcpClientConnection(self._conn, self._addr),
+            flags=flags)
+        self.protocol_handler.initialize()
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
+            b'GET /hello HTTP/1.1',
+            CRLF,
+        ]))
+        self.protocol_handler.run_once()
+        self._conn.send.assert_called_once()
         self.assertEqual(
             self.protocol_handler.client.buffer[0],
             HttpWebServerPlugin.DEFAULT_404_RESPONSE)
 
     @unittest.skipIf(os.environ.get('GITHUB_ACTIONS', False),
                      'Disabled on GitHub actions because this test is flaky on GitHub infrastructure.')
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_static_web_server_serves(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
+        html_file_content = self.init_static_web_server_request(
+            mock_fromfd, mock_selector,
+            headers={b'Accept-Encoding': b'gzip, deflate'})
+        self._conn.sendmsg.side_effect = lambda iov: sum(len(b) for b in iov)
+
+        self.protocol_handler.run_once()
+
+        self.assertEqual(mock_selector.return_value.select.call_count, 1)
+        self.assertEqual(self._conn.sendmsg.call_count, 1)
+        encoded_html_file_content = gzip.compress(html_file_content)
+        self.assertEqual(self._conn.sendmsg.call_args[0][0], [build_http_response(
+            200, reason=b'OK', headers={
+                b'Content-Type': b'text/html',
+                b'Cache-Control': b'max-age=86400',
+                b'Content-Encoding': b'gzip',
+                b'Connection': b'close',
+                b'Content-Length': bytes_(len(encoded_html_file_content)),
+            }
+        ), encoded_html_file_content])
+
+    @unittest.skipIf(not SENDFILE_SUPPORTED,
+                     'os.sendfile is not used on this platform.')
+    @mock.patch('os.sendfile')
+    @mock.patch('proxy.http.handler.FastSelector')
+    @mock.patch('socket.fromfd')
+    def test_static_web_server_serves_using_sendfile(
+            self,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock,
+            mock_sendfile: mock.Mock) -> None:
+        html_file_content = self.init_static_web_server_request(
+            mock_fromfd, mock_selector, max_cached_file_size=0)
+        headers = build_http_response(
+            200, reason=b'OK', headers={
+                b'Content-Type': b'text/html',
+                b'Cache-Control': b'max-age=86400',
+                b'Connection': b'close',
+                b'Content-Length': bytes_(len(html_file_content)),
+            })
+        self._conn.send.return_value = len(headers)
+        mock_sendfile.return_value = len(html_file_content)
+
+        self.assertTrue(self.protocol_handler.run_once())
+
+        self.assertEqual(mock_selector.return_value.select.call_count, 1)
+        self.assertEqual(self._conn.send.call_count, 1)
+        self.assertEqual(self._conn.send.call_args[0][0], headers)
+        mock_sendfile.assert_called_once()
+        self.assertEqual(
+            mock_sendfile.call_args[0][2:],
+            (0, len(html_file_content)))
+
+    @unittest.skipIf(not SENDFILE_SUPPORTED,
+                     'os.sendfile is not used on this platform.')
+    @mock.patch('os.sendfile')
+    @mock.patch('proxy.http.handler.FastSelector')
+    @mock.patch('socket.fromfd')
+    def test_pending_sendfile_response_keeps_connection_active(
+            self,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock,
+            mock_sendfile: mock.Mock) -> None:
+        self.init_static_web_server_request(
+            mock_fromfd, mock_selector, max_cached_file_size=0)
+        self._conn.send.side_effect = lambda data, *args: len(data)
+        mock_sendfile.side_effect = BlockingIOError()
+
+        self.assertFalse(self.protocol_handler.run_once())
+
+        web = self.protocol_handler.plugins['HttpWebServerPlugin']
+        self.assertTrue(web.has_pending())
+        self.protocol_handler.last_activity = 0
+        self.assertFalse(self.protocol_handler.is_inactive())
+
+    @unittest.skipIf(not SENDFILE_SUPPORTED,
+                     'os.sendfile is not used on this platform.')
+    @mock.patch('os.sendfile')
+    @mock.patch('proxy.http.handler.FastSelector')
+    @mock.patch('socket.fromfd')
+    def test_static_web_server_serves_small_file_from_memory(
+            self,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock,
+            mock_sendfile: mock.Mock) -> None:
+        html_file_content = self.init_static_web_server_request(
+            mock_fromfd, mock_selector)
+        self._conn.sendmsg.side_effect = lambda iov: sum(len(b) for b in iov)
+
+        self.protocol_handler.run_once()
+
+        self.assertEqual(mock_selector.return_value.select.call_count, 1)
+        mock_sendfile.assert_not_called()
+        self.assertEqual(self._conn.sendmsg.call_count, 1)
+        self.assertEqual(self._conn.sendmsg.call_args[0][0], [build_http_response(
+            200, reason=b'OK', headers={
+                b'Content-Type': b'text/html',
+                b'Cache-Control': b'max-age=86400',
+                b'Connection': b'close',
+                b'Content-Length': bytes_(len(html_file_content)),
+            }
+        ), html_file_content])
+
+    @mock.patch('proxy.http.server.web.SENDFILE_SUPPORTED', False)
+    @mock.patch.object(HttpWebServerPlugin, 'map_static_file')
+    @mock.patch('proxy.http.handler.FastSelector')
+    @mock.patch('socket.fromfd')
+    def test_small_file_served_from_memory_without_sendfile(
+            self,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock,
+            mock_map_static_file: mock.Mock) -> None:
+        html_file_content = self.init_static_web_server_request(
+            mock_fromfd, mock_selector)
+        self._conn.sendmsg.side_effect = lambda iov: sum(len(b) for b in iov)
+
+        self.protocol_handler.run_once()
+
+        mock_map_static_file.assert_not_called()
+        self.assertEqual(self._conn.sendmsg.call_count, 1)
+        self.assertEqual(self._conn.sendmsg.call_args[0][0], [build_http_response(
+            200, reason=b'OK', headers={
+                b'Content-Type': b'text/html',
+                b'Cache-Control': b'max-age=86400',
+                b'Connection': b'close',
+                b'Content-Length': bytes_(len(html_file_content)),
+            }
+        ), html_file_content])
+
+    def test_small_file_cache_invalidated_on_change(self) -> None:
+        static_server_dir = os.path.join(tempfile.gettempdir(), 'static')
+        file_path = os.path.join(static_server_dir, 'small.txt')
+        os.makedirs(static_server_dir, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'hello')
+        response = HttpWebServerPlugin.cached_small_file_response(file_path, 4096)
+        assert response is not None
+        self.assertEqual(response[1], b'hello')
+        self.assertIs(
+            HttpWebServerPlugin.cached_small_file_response(file_path, 4096),
+            response)
+        self.assertIs(
+            HttpWebServerPlugin.cached_small_file_response(
+                os.path.join(static_server_dir, '.', 'small.txt'), 4096),
+            response)
+        with open(file_path, 'wb') as f:
+            f.write(b'hello world')
+        response = HttpWebServerPlugin.cached_small_file_response(file_path, 4096)
+        assert response is not None
+        self.assertEqual(response[1], b'hello world')
+        self.assertIsNone(
+            HttpWebServerPlugin.cached_small_file_response(file_path, 5))
+
+    @unittest.skipIf(not SENDFILE_SUPPORTED,
+                     'Static file descriptors are only cached along with os.sendfile.')
+    def test_static_file_fd_reused_and_closed_on_change(self) -> None:
+        static_server_dir = os.path.join(tempfile.gettempdir(), 'static')
+        file_path = os.path.join(static_server_dir, 'fd.txt')
+        os.makedirs(static_server_dir, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'hello')
+        fd, size = HttpWebServerPlugin.acquire_static_file_fd(file_path)
+        self.assertEqual(size, 5)
+        self.assertEqual(
+            HttpWebServerPlugin.acquire_static_file_fd(file_path), (fd, 5))
+        HttpWebServerPlugin.release_static_file_fd(fd)
+        with open(file_path, 'wb') as f:
+            f.write(b'hello world')
+        new_fd, size = HttpWebServerPlugin.acquire_static_file_fd(file_path)
+        self.assertEqual(size, 11)
+        self.assertEqual(os.pread(new_fd, size, 0), b'hello world')
+        # Stale descriptor stays open until released by its last user
+        self.assertIn(fd, HttpWebServerPlugin.fd_evicted)
+        HttpWebServerPlugin.release_static_file_fd(fd)
+        self.assertNotIn(fd, HttpWebServerPlugin.fd_evicted)
+        self.assertNotIn(fd, HttpWebServerPlugin.fd_refs)
+        HttpWebServerPlugin.release_static_file_fd(new_fd)
+
+    def test_static_file_unmapped_after_use(self) -> None:
+        static_server_dir = os.path.join(tempfile.gettempdir(), 'static')
+        file_path = os.path.join(static_server_dir, 'mmap.txt')
+        os.makedirs(static_server_dir, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'hello')
+        with HttpWebServerPlugin.map_static_file(file_path) as mm:
+            self.assertEqual(mm[:], b'hello')
+        # Mappings must not outlive the request, a file truncated
+        # on disk would otherwise fault later readers with SIGBUS.
+        assert isinstance(mm, mmap.mmap)
+        self.assertTrue(mm.closed)
+        with open(file_path, 'wb') as f:
+            f.write(b'')
+        with HttpWebServerPlugin.map_static_file(file_path) as mm:
+            self.assertEqual(mm, b'')
+
+    def test_static_files_precompressed(self) -> None:
+        static_server_dir = os.path.join(tempfile.gettempdir(), 'precompressed')
+        file_path = os.path.join(static_server_dir, 'nested', 'app.js')
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'console.log("proxy.py");')
+        # Compressed on first request, reused afterwards
+        response = HttpWebServerPlugin.read_and_build_static_file_response(
+            file_path)
+        self.assertIs(
+            HttpWebServerPlugin.precompressed_response(
+                static_server_dir + '/nested/app.js'),
+            response)
+
+    @mock.patch.object(HttpWebServerPlugin, 'MAX_PRECOMPRESSED_BYTES', 64)
+    def test_precompressed_responses_bounded_by_size(self) -> None:
+        static_server_dir = os.path.join(tempfile.gettempdir(), 'precompressed')
+        os.makedirs(static_server_dir, exist_ok=True)
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(static_server_dir, 'bounded%d.txt' % i))
+            with open(paths[-1], 'wb') as f:
+                f.write(os.urandom(24))
+            HttpWebServerPlugin.precompressed_response(paths[-1])
+        self.assertLessEqual(HttpWebServerPlugin.precompressed_bytes, 64)
+        self.assertNotIn(paths[0], HttpWebServerPlugin.precompressed)
+        self.assertIn(paths[-1], HttpWebServerPlugin.precompressed)
+
+    def init_static_web_server_request(
+            self,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock,
+            headers: Optional[Dict[bytes, bytes]] = None,
+            max_cached_file_size: int = DEFAULT_MAX_CACHED_FILE_SIZE) -> bytes:
         # Setup a static directory
         static_server_dir = os.path.join(tempfile.gettempdir(), 'static')
         index_file_path = os.path.join(static_server_dir, 'index.html')
@@ -132,77 +388,44 @@ class TestWebServerPlugin(unittest.TestCase):
             f.write(html_file_content)
 
         self._conn = mock_fromfd.return_value
-        self._conn.recv.return_value = build_http_request(
-            b'GET', b'/index.html')
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
+            b'GET', b'/index.html', headers=headers))
 
         mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)],
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_WRITE,
-                data=None), selectors.EVENT_WRITE)], ]
+            [(self._conn, selectors.EVENT_READ | selectors.EVENT_WRITE)], ]
 
         flags = Proxy.initialize(
             enable_static_server=True,
-            static_server_dir=static_server_dir)
+            static_server_dir=static_server_dir,
+            max_cached_file_size=max_cached_file_size)
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
 
         self.protocol_handler = HttpProtocolHandler(
             TcpClientConnection(self._conn, self._addr),
             flags=flags)
         self.protocol_handler.initialize()
+        return html_file_content
 
-        self.protocol_handler.run_once()
-        self.protocol_handler.run_once()
-
-        self.assertEqual(mock_selector.return_value.select.call_count, 2)
-        self.assertEqual(self._conn.send.call_count, 1)
-        encoded_html_file_content = gzip.compress(html_file_content)
-        self.assertEqual(self._conn.send.call_args[0][0], build_http_response(
-            200, reason=b'OK', headers={
-                b'Content-Type': b'text/html',
-                b'Cache-Control': b'max-age=86400',
-                b'Content-Encoding': b'gzip',
-                b'Connection': b'close',
-                b'Content-Length': bytes_(len(encoded_html_file_content)),
-            },
-            body=encoded_html_file_content
-        ))
-
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def test_static_web_server_serves_404(
             self,
             mock_fromfd: mock.Mock,
             mock_selector: mock.Mock) -> None:
         self._conn = mock_fromfd.return_value
-        self._conn.recv.return_value = build_http_request(
-            b'GET', b'/not-found.html')
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
+            b'GET', b'/not-found.html'))
 
         mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)],
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_WRITE,
-                data=None), selectors.EVENT_WRITE)], ]
+            [(self._conn, selectors.EVENT_READ | selectors.EVENT_WRITE)], ]
 
         flags = Proxy.initialize(enable_static_server=True)
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
         ])
 
         self.protocol_handler = HttpProtocolHandler(
@@ -210,10 +433,9 @@ class TestWebServerPlugin(unittest.TestCase):
             flags=flags)
         self.protocol_handler.initialize()
 
-        self.protocol_handler.run_once()
         self.protocol_handler.run_once()
 
-        self.assertEqual(mock_selector.return_value.select.call_count, 2)
+        self.assertEqual(mock_selector.return_value.select.call_count, 1)
         self.assertEqual(self._conn.send.call_count, 1)
         self.assertEqual(self._conn.send.call_args[0][0],
                          HttpWebServerPlugin.DEFAULT_404_RESPONSE)
@@ -239,23 +461,19 @@ class TestWebServerPlugin(unittest.TestCase):
     def init_and_make_pac_file_request(self, pac_file: str) -> None:
         flags = Proxy.initialize(pac_file=pac_file)
         flags.plugins = Proxy.load_plugins([
-            bytes_(PLUGIN_HTTP_PROXY),
-            bytes_(PLUGIN_WEB_SERVER),
-            bytes_(PLUGIN_PAC_FILE),
+            PLUGIN_HTTP_PROXY,
+            PLUGIN_WEB_SERVER,
+            PLUGIN_PAC_FILE,
         ])
         self.protocol_handler = HttpProtocolHandler(
             TcpClientConnection(self._conn, self._addr),
             flags=flags)
         self.protocol_handler.initialize()
-        self._conn.recv.return_value = CRLF.join([
+        self._conn.recv_into.side_effect = mock_recv_into(CRLF.join([
             b'GET / HTTP/1.1',
             CRLF,
-        ])
+        ]))
 
     def mock_selector_for_client_read(self, mock_selector: mock.Mock) -> None:
-        mock_selector.return_value.select.return_value = [(
-            selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ), ]
+        mock_selector.return_value.select.return_value = [
+            (self._conn, selectors.EVENT_READ), ]
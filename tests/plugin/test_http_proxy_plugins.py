@@ -28,11 +28,12 @@ from proxy.http.codes import httpStatusCodes
 from proxy.plugin import ProposedRestApiPlugin, RedirectToCustomServerPlugin
 
 from .utils import get_plugin_by_test_name
+from ..utils import mock_recv_into
 
 
 class TestHttpProxyPluginExamples(unittest.TestCase):
 
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self,
               mock_fromfd: mock.Mock,
@@ -67,7 +68,7 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
         original = b'{"key": "value"}'
         modified = b'{"key": "modified"}'
 
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'POST', b'http://httpbin.org/post',
             headers={
                 b'Host': b'httpbin.org',
@@ -75,13 +76,9 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
                 b'Content-Length': bytes_(len(original)),
             },
             body=original
-        )
+        ))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
 
         self.protocol_handler.run_once()
         mock_server_conn.assert_called_with('httpbin.org', DEFAULT_HTTP_PORT)
@@ -102,24 +99,20 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
     def test_proposed_rest_api_plugin(
             self, mock_server_conn: mock.Mock) -> None:
         path = b'/v1/users/'
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             b'GET', b'http://%s%s' % (
                 ProposedRestApiPlugin.API_SERVER, path),
             headers={
                 b'Host': ProposedRestApiPlugin.API_SERVER,
             }
-        )
+        ))
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
         self.protocol_handler.run_once()
 
         mock_server_conn.assert_not_called()
         self.assertEqual(
-            self.protocol_handler.client.buffer[0].tobytes(),
+            self._conn.send.call_args[0][0],
             build_http_response(
                 httpStatusCodes.OK, reason=b'OK',
                 headers={b'Content-Type': b'application/json'},
@@ -137,13 +130,9 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
                 b'Host': b'example.org',
             }
         )
-        self._conn.recv.return_value = request
+        self._conn.recv_into.side_effect = mock_recv_into(request)
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
         self.protocol_handler.run_once()
 
         upstream = urlparse.urlsplit(
@@ -168,18 +157,14 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
                 b'Host': b'facebook.com',
             }
         )
-        self._conn.recv.return_value = request
+        self._conn.recv_into.side_effect = mock_recv_into(request)
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
         self.protocol_handler.run_once()
 
         mock_server_conn.assert_not_called()
         self.assertEqual(
-            self.protocol_handler.client.buffer[0].tobytes(),
+            self._conn.send.call_args[0][0],
             build_http_response(
                 status_code=httpStatusCodes.I_AM_A_TEAPOT,
                 reason=b'I\'m a tea pot',
@@ -198,7 +183,7 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
                 b'Host': b'super.secure',
             }
         )
-        self._conn.recv.return_value = request
+        self._conn.recv_into.side_effect = mock_recv_into(request)
 
         server = mock_server_conn.return_value
         server.connect.return_value = True
@@ -213,21 +198,9 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
         type(server).closed = mock.PropertyMock(side_effect=closed)
 
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)],
-            [(selectors.SelectorKey(
-                fileobj=server.connection,
-                fd=server.connection.fileno,
-                events=selectors.EVENT_WRITE,
-                data=None), selectors.EVENT_WRITE)],
-            [(selectors.SelectorKey(
-                fileobj=server.connection,
-                fd=server.connection.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)],
+            [(server.connection, selectors.EVENT_WRITE)],
+            [(server.connection, selectors.EVENT_READ)], ]
 
         # Client read
         self.protocol_handler.run_once()
@@ -269,17 +242,13 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
                 b'Host': b'www.facebook.com',
             }
         )
-        self._conn.recv.return_value = request
+        self._conn.recv_into.side_effect = mock_recv_into(request)
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)], ]
         self.protocol_handler.run_once()
 
         self.assertEqual(
-            self.protocol_handler.client.buffer[0].tobytes(),
+            self._conn.send.call_args[0][0],
             build_http_response(
                 status_code=httpStatusCodes.NOT_FOUND,
                 reason=b'Blocked',
@@ -26,6 +26,7 @@ from proxy.http.handler import HttpProtocolHandler
 from proxy.http.proxy import HttpProxyPlugin
 
 from .utils import get_plugin_by_test_name
+from ..utils import mock_recv_into
 
 
 class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
@@ -36,7 +37,7 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
     @mock.patch('proxy.http.proxy.server.gen_public_key')
     @mock.patch('proxy.http.proxy.server.gen_csr')
     @mock.patch('proxy.http.proxy.server.sign_csr')
-    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('proxy.http.handler.FastSelector')
     @mock.patch('socket.fromfd')
     def setUp(self,
               mock_fromfd: mock.Mock,
@@ -109,35 +110,19 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
             side_effect=mock_connection)
 
         self.mock_selector.return_value.select.side_effect = [
-            [(selectors.SelectorKey(
-                fileobj=self._conn,
-                fd=self._conn.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)],
-            [(selectors.SelectorKey(
-                fileobj=self.client_ssl_connection,
-                fd=self.client_ssl_connection.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)],
-            [(selectors.SelectorKey(
-                fileobj=self.server_ssl_connection,
-                fd=self.server_ssl_connection.fileno,
-                events=selectors.EVENT_WRITE,
-                data=None), selectors.EVENT_WRITE)],
-            [(selectors.SelectorKey(
-                fileobj=self.server_ssl_connection,
-                fd=self.server_ssl_connection.fileno,
-                events=selectors.EVENT_READ,
-                data=None), selectors.EVENT_READ)], ]
+            [(self._conn, selectors.EVENT_READ)],
+            [(self.client_ssl_connection, selectors.EVENT_READ)],
+            [(self.server_ssl_connection, selectors.EVENT_WRITE)],
+            [(self.server_ssl_connection, selectors.EVENT_READ)], ]
 
         # Connect
         def send(raw: bytes) -> int:
             return len(raw)
 
         self._conn.send.side_effect = send
-        self._conn.recv.return_value = build_http_request(
+        self._conn.recv_into.side_effect = mock_recv_into(build_http_request(
             httpMethods.CONNECT, b'uni.corn:443'
-        )
+        ))
         self.protocol_handler.run_once()
 
         self.assertEqual(self.mock_sign_csr.call_count, 1)
@@ -158,7 +143,7 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
     def test_modify_post_data_plugin(self) -> None:
         original = b'{"key": "value"}'
         modified = b'{"key": "modified"}'
-        self.client_ssl_connection.recv.return_value = build_http_request(
+        self.client_ssl_connection.recv_into.side_effect = mock_recv_into(build_http_request(
             b'POST', b'/',
             headers={
                 b'Host': b'uni.corn',
@@ -166,7 +151,7 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
                 b'Content-Length': bytes_(len(original)),
             },
             body=original
-        )
+        ))
         self.protocol_handler.run_once()
         self.server.queue.assert_called_with(
             build_http_request(
@@ -187,7 +172,7 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
                 b'Host': b'uni.corn',
             }
         )
-        self.client_ssl_connection.recv.return_value = request
+        self.client_ssl_connection.recv_into.side_effect = mock_recv_into(request)
 
         # Client read
         self.protocol_handler.run_once()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+    proxy.py
+    ~~~~~~~~
+    ⚡⚡⚡ Fast, Lightweight, Pluggable, TLS interception capable proxy server focused on
+    Network monitoring, controls & Application development, testing, debugging.
+
+    :copyright: (c) 2013-present by Abhinav Singh and contributors.
+    :license: BSD, see LICENSE for more details.
+"""
+from typing import Callable
+
+
+def mock_recv_into(data: bytes) -> Callable[..., int]:
+    """Returns side effect for mocked socket.recv_into,
+    which copies data into the receive buffer on every call."""
+    def recv_into(buf: bytearray, nbytes: int = 0, flags: int = 0) -> int:
+        buf[:len(data)] = data
+        return len(data)
+    return recv_into